@@ -0,0 +1,184 @@
+"""
+Minimal stand-ins for the discord.py objects the slash command handlers
+touch, plus stubs for the bot's network backends (GCE, mcstatus, Crafty,
+the stats ping), so the real handlers in `main.py` run with no network.
+"""
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import asyncio
+import itertools
+
+import discord
+
+_ids = itertools.count(1)
+
+
+class FakeRole:
+    def __init__(self, role_id):
+        self.id = role_id
+
+
+class FakeUser:
+    def __init__(self, roles=()):
+        self.id = next(_ids)
+        self.roles = [FakeRole(role_id) for role_id in roles]
+
+
+class FakeResponse:
+    """
+    `interaction.response`: records what was sent, sleeping `latency`
+    seconds per call to stand in for the Discord API round trip.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.deferred = False
+        self.sent = []
+
+    def is_done(self):
+        return self.deferred or bool(self.sent)
+
+    async def defer(self, **kwargs):
+        await asyncio.sleep(self.latency)
+        self.deferred = True
+
+    async def send_message(self, content=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        self.sent.append({"content": content, **kwargs})
+
+
+class FakeFollowup:
+    """
+    `interaction.followup` (a webhook): records every `send()`.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        self.sent.append({"content": content, **kwargs})
+
+
+class FakeInteraction:
+    """
+    Just enough of `discord.Interaction` for the handlers, the command tree
+    hooks and tracing.
+
+    Args:
+        command: The `app_commands.Command` being invoked, if any.
+        latency: Simulated Discord API latency for responses and followups.
+        roles: Role IDs of the invoking user (see `is_admin`).
+    """
+
+    type = discord.InteractionType.application_command
+
+    def __init__(self, command=None, latency=0.0, roles=()):
+        self.id = next(_ids)
+        self.command = command
+        self.created_at = datetime.now(timezone.utc)
+        self.extras = {}
+        self.user = FakeUser(roles)
+        self.guild = None
+        self.channel = None
+        self.response = FakeResponse(latency)
+        self.followup = FakeFollowup(latency)
+
+    @property
+    def replies(self):
+        return self.response.sent + self.followup.sent
+
+
+class BackendStubs:
+    """
+    Replacements for the network-bound functions `main.py` imports. Each
+    sleeps for its configured latency and returns a canned value.
+
+    Args:
+        vm_status: Value returned by `get_vm_status`.
+        player_count: Value returned by `get_player_count`.
+        latency: Seconds each stubbed call takes.
+    """
+
+    def __init__(self, vm_status="RUNNING", player_count=12, latency=0.0):
+        self.vm_status = vm_status
+        self.player_count = player_count
+        self.latency = latency
+        self.calls = {}
+
+    def _count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    async def get_vm_status(self):
+        self._count("get_vm_status")
+        await asyncio.sleep(self.latency)
+        return self.vm_status
+
+    async def get_player_count(self):
+        self._count("get_player_count")
+        await asyncio.sleep(self.latency)
+        return self.player_count
+
+    async def refresh_stats(self):
+        self._count("refresh_stats")
+        await asyncio.sleep(self.latency)
+        return True
+
+    async def refresh_player(self, uuid):
+        self._count("refresh_player")
+        await asyncio.sleep(self.latency)
+        return True
+
+    async def noop(self, *args, **kwargs):
+        await asyncio.sleep(self.latency)
+
+
+@contextmanager
+def stub_backends(main, stubs=None):
+    """
+    Patch `main`'s GCE, mcstatus, Crafty and stats-ping entry points with
+    `stubs` for the duration of the block.
+
+    Args:
+        main: The imported `main` module.
+        stubs: `BackendStubs` instance (defaults to instant, server running).
+    """
+    stubs = stubs or BackendStubs()
+    replacements = {
+        "get_vm_status": stubs.get_vm_status,
+        "get_player_count": stubs.get_player_count,
+        "refresh_stats": stubs.refresh_stats,
+        "refresh_player": stubs.refresh_player,
+        "start_vm": stubs.noop,
+        "stop_vm": stubs.noop,
+        "stop_mc_server": stubs.noop,
+    }
+    originals = {name: getattr(main, name) for name in replacements}
+    for name, replacement in replacements.items():
+        setattr(main, name, replacement)
+    try:
+        yield stubs
+    finally:
+        for name, original in originals.items():
+            setattr(main, name, original)
+
+
+async def invoke(main, name, interaction, **params):
+    """
+    Run slash command `name` the way the command tree would: receipt hook,
+    the handler itself, then the completion or error hook.
+
+    Returns:
+        The `FakeInteraction`, with everything the handler sent.
+    """
+    command = main.tree.get_command(name)
+    interaction.command = command
+    await main.tree.interaction_check(interaction)
+    try:
+        await command.callback(interaction, **params)
+    except Exception:
+        main.record_command_latency(interaction, "error")
+        raise
+    main.record_command_latency(interaction, "ok")
+    return interaction
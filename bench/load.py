@@ -0,0 +1,236 @@
+"""
+Headless load generator: many simulated users running slash commands at
+once against the real handlers in `main.py`.
+
+    python -m bench.load --concurrency 50 --duration 20
+    python -m bench.load --burst 300 --mix stats_server=5,graph=2,players=3
+    python -m bench.load --discord-latency 0.08 --backend-latency 0.2
+
+Discord objects are fakes (bench/fakes.py), GCE/mcstatus/Crafty/stats
+pings are stubs and Mongo is the in-process store, so nothing touches the
+network. Reports throughput, latency percentiles per command and how long
+the event loop was blocked.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+DEFAULT_MIX = "stats_server=4,stats_player=3,duels=2,players=2,graph=1,help=1"
+GRAPH_METRICS = ["players", "cpu", "cpu_jvm", "ram", "heap", "chunks", "cpu,cpu_jvm"]
+GRAPH_WINDOWS = [30, 60, 360, 1440]
+# Loop lag above this counts as the loop being blocked.
+BLOCK_THRESHOLD_SECONDS = 0.01
+LAG_SAMPLE_SECONDS = 0.005
+
+
+def _parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - set(COMMANDS)
+    if unknown:
+        raise SystemExit(f"Unknown commands in --mix: {', '.join(sorted(unknown))}")
+    return mix
+
+
+def _stats_server(rng):
+    return "stats", {"mode": "server", "player": None}
+
+
+def _stats_player(rng):
+    from bench.seed import player_name
+    return "stats", {"mode": "player", "player": player_name(rng.randrange(100))}
+
+
+def _duels(rng):
+    from bench.seed import player_name
+    return "duels", {"username": player_name(rng.randrange(100))}
+
+
+def _players(rng):
+    return "players", {}
+
+
+def _graph(rng):
+    return "graph", {"metric": rng.choice(GRAPH_METRICS), "minutes": rng.choice(GRAPH_WINDOWS)}
+
+
+def _help(rng):
+    return "help", {"target": None}
+
+
+COMMANDS = {
+    "stats_server": _stats_server,
+    "stats_player": _stats_player,
+    "duels": _duels,
+    "players": _players,
+    "graph": _graph,
+    "help": _help,
+}
+
+
+class LoopBlockMonitor:
+    """
+    Samples event loop lag every `LAG_SAMPLE_SECONDS`: any lag is time the
+    loop spent running something else instead of waking this task.
+    """
+
+    def __init__(self):
+        self.lags = []
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(LAG_SAMPLE_SECONDS)
+            self.lags.append(max(0.0, loop.time() - start - LAG_SAMPLE_SECONDS))
+
+    def report(self):
+        blocked = [lag for lag in self.lags if lag > BLOCK_THRESHOLD_SECONDS]
+        lags = sorted(self.lags) or [0.0]
+        return {
+            "samples": len(self.lags),
+            "max_ms": round(lags[-1] * 1000, 2),
+            "p99_ms": round(lags[min(len(lags) - 1, int(0.99 * len(lags)))] * 1000, 2),
+            "blocked_events": len(blocked),
+            "blocked_total_ms": round(sum(blocked) * 1000, 1),
+        }
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda pct: samples[min(len(samples) - 1, int(pct / 100 * len(samples)))]
+    return {
+        "count": len(samples),
+        "p50_ms": round(pick(50) * 1000, 2),
+        "p95_ms": round(pick(95) * 1000, 2),
+        "p99_ms": round(pick(99) * 1000, 2),
+        "max_ms": round(samples[-1] * 1000, 2),
+    }
+
+
+async def _run(args):
+    import main
+    from bench import fakes
+    from bench.memstore import MemStore
+    from stats import graphs
+
+    MemStore(args.docs).install()
+    rng = random.Random(args.seed)
+    mix = _parse_mix(args.mix)
+    names, weights = list(mix), list(mix.values())
+
+    latencies = {}
+    errors = {}
+    stubs = fakes.BackendStubs(latency=args.backend_latency)
+
+    async def one_request():
+        kind = rng.choices(names, weights)[0]
+        command, params = COMMANDS[kind](rng)
+        interaction = fakes.FakeInteraction(latency=args.discord_latency)
+        start = time.perf_counter()
+        try:
+            await fakes.invoke(main, command, interaction, **params)
+        except Exception as e:
+            key = f"{kind}: {type(e).__name__}"
+            errors[key] = errors.get(key, 0) + 1
+            return
+        latencies.setdefault(kind, []).append(time.perf_counter() - start)
+
+    async def worker(deadline):
+        while time.perf_counter() < deadline:
+            await one_request()
+
+    monitor = LoopBlockMonitor()
+    try:
+        with fakes.stub_backends(main, stubs):
+            # Start the render pool outside the measured window.
+            await graphs.plot_metric("player_count", 60)
+            monitor.start()
+            started = time.perf_counter()
+            if args.burst:
+                await asyncio.gather(*(one_request() for _ in range(args.burst)))
+            else:
+                deadline = started + args.duration
+                await asyncio.gather(*(worker(deadline) for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - started
+            await monitor.stop()
+    finally:
+        graphs.shutdown_render_pool()
+
+    completed = sum(len(samples) for samples in latencies.values())
+    every = [sample for samples in latencies.values() for sample in samples]
+    return {
+        "mode": f"burst of {args.burst}" if args.burst else f"{args.concurrency} users for {args.duration}s",
+        "elapsed_s": round(elapsed, 2),
+        "completed": completed,
+        "errors": errors,
+        "throughput_per_s": round(completed / elapsed, 1) if elapsed else None,
+        "overall": _percentiles(every) if every else None,
+        "commands": {kind: _percentiles(samples) for kind, samples in sorted(latencies.items())},
+        "event_loop": monitor.report(),
+        "backend_calls": stubs.calls,
+    }
+
+
+def _print_report(report):
+    print(f"\n[LOAD] {report['mode']}: {report['completed']} commands in {report['elapsed_s']}s "
+          f"({report['throughput_per_s']}/s), {sum(report['errors'].values())} errors")
+    print(f"  {'command':<16}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    rows = dict(report["commands"])
+    if report["overall"]:
+        rows["(all)"] = report["overall"]
+    for kind, stats in rows.items():
+        print(f"  {kind:<16}{stats['count']:>7}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}"
+              f"{stats['p99_ms']:>10.1f}{stats['max_ms']:>10.1f}")
+    loop = report["event_loop"]
+    print(f"  event loop: max lag {loop['max_ms']} ms, p99 {loop['p99_ms']} ms, "
+          f"blocked >{BLOCK_THRESHOLD_SECONDS * 1000:.0f} ms {loop['blocked_events']} times "
+          f"({loop['blocked_total_ms']} ms total)")
+    for error, count in report["errors"].items():
+        print(f"  error {error}: {count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=25, help="Simulated users issuing commands back to back")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds to run in closed-loop mode")
+    parser.add_argument("--burst", type=int, help="Fire this many commands at once instead")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="command=weight,... from: " + ", ".join(COMMANDS))
+    parser.add_argument("--discord-latency", type=float, default=0.05, help="Seconds per simulated Discord API call")
+    parser.add_argument("--backend-latency", type=float, default=0.02, help="Seconds per stubbed GCE/mcstatus/ping call")
+    parser.add_argument("--docs", type=int, default=100_000, help="Synthetic metric samples in the in-memory store")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    # main.py reads these at import time; the client is never used since the
+    # in-memory store replaces every query.
+    os.environ.setdefault("TRACE_LOG", "0")
+    os.environ["MONGO_URI"] = "mongodb://localhost:27017"
+    os.environ["MONGO_DB"] = "mcbot_bench"
+
+    report = asyncio.run(_run(args))
+    _print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
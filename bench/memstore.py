@@ -0,0 +1,142 @@
+"""
+In-process stand-in for the bot's MongoDB, swapped in at the level of the
+`stats.mongo` query functions. Metrics are held as NumPy columns so even
+10M samples fit in memory; results have the same shape the real queries
+return (lists of dicts, oldest first).
+"""
+from datetime import datetime
+import numpy as np
+
+from bench import seed
+
+
+class MemStore:
+    """
+    Args:
+        docs: Number of `server_metrics` samples to generate.
+    """
+
+    def __init__(self, docs):
+        self.columns = seed.metric_columns(docs)
+        count = seed.player_count_for(docs)
+        self.players = {doc["name"].lower(): doc for doc in seed.player_documents(count)}
+        self.duels = {doc["name"].lower(): doc for doc in seed.duel_documents(count)}
+        self._online = [{"name": doc["name"]} for doc in self.players.values() if doc["online"]]
+        # Rollup tiers by bucket width, built lazily by `_rollup`.
+        self._tiers = {}
+
+    def _since(self, since):
+        return int(np.searchsorted(self.columns["timestamp"], np.datetime64(since, "ms")))
+
+    async def latest_server_metrics(self):
+        if not len(self.columns["timestamp"]):
+            return None
+        last = len(self.columns["timestamp"]) - 1
+        return seed.metric_documents(self.columns, last, last + 1)[0]
+
+    async def latest_metrics_timestamp(self):
+        if not len(self.columns["timestamp"]):
+            return None
+        return self.columns["timestamp"][-1].astype(datetime)
+
+    async def online_players(self):
+        return list(self._online)
+
+    async def find_player(self, name):
+        return self.players.get(name.lower())
+
+    async def find_duels(self, name):
+        return self.duels.get(name.lower())
+
+    async def metric_series(self, fields, since):
+        start = self._since(since)
+        times = self.columns["timestamp"][start:].tolist()
+        values = [self.columns[field][start:].tolist() for field in fields]
+        return [
+            {"timestamp": timestamp, **{field: column[i] for field, column in zip(fields, values)}}
+            for i, timestamp in enumerate(times)
+        ]
+
+    def _rollup(self, seconds):
+        """
+        The `seconds`-wide rollup tier, built from the raw samples on first
+        use: bucket start times, sample counts, and per-field min/avg/max
+        filled in by `_rollup_field`.
+        """
+        tier = self._tiers.get(seconds)
+        if tier is None:
+            millis = self.columns["timestamp"].astype(np.int64)
+            keys, starts, counts = np.unique(millis // (seconds * 1000), return_index=True, return_counts=True)
+            tier = self._tiers[seconds] = {
+                "timestamp": (keys * seconds * 1000).astype("datetime64[ms]"),
+                "count": counts,
+                "starts": starts,
+                "fields": {},
+            }
+        return tier
+
+    def _rollup_field(self, tier, field):
+        if field not in tier["fields"]:
+            values = self.columns[field].astype(np.float64)
+            starts = tier["starts"]
+            tier["fields"][field] = (
+                np.minimum.reduceat(values, starts),
+                np.add.reduceat(values, starts) / tier["count"],
+                np.maximum.reduceat(values, starts),
+            )
+        return tier["fields"][field]
+
+    async def metric_buckets(self, fields, since, bucket_seconds, tier=None):
+        rolled_up = tier is not None and tier.rolled_up
+        if rolled_up:
+            rollup = self._rollup(tier.seconds)
+            timestamps, weights = rollup["timestamp"], rollup["count"]
+        else:
+            timestamps = self.columns["timestamp"]
+            weights = np.ones(len(timestamps), dtype=np.int64)
+
+        start = int(np.searchsorted(timestamps, np.datetime64(since, "ms")))
+        millis = timestamps[start:].astype(np.int64)
+        if not len(millis):
+            return []
+
+        buckets = millis // (bucket_seconds * 1000)
+        keys, starts = np.unique(buckets, return_index=True)
+        totals = np.add.reduceat(weights[start:], starts)
+        rows = [
+            {"timestamp": np.datetime64(int(key) * bucket_seconds * 1000, "ms").astype(datetime)}
+            for key in keys
+        ]
+        for field in fields:
+            if rolled_up:
+                lows, means, highs = (column[start:] for column in self._rollup_field(rollup, field))
+            else:
+                lows = means = highs = self.columns[field][start:].astype(np.float64)
+            # Rollup averages are weighted by their sample counts, as in Mongo.
+            lows = np.minimum.reduceat(lows, starts).tolist()
+            highs = np.maximum.reduceat(highs, starts).tolist()
+            means = (np.add.reduceat(means * weights[start:], starts) / totals).tolist()
+            for row, low, mean, high in zip(rows, lows, means, highs):
+                row[f"{field}__min"], row[f"{field}__avg"], row[f"{field}__max"] = low, mean, high
+        return rows
+
+    def install(self):
+        """
+        Point `stats.mongo` (and modules that imported its functions by name)
+        at this store.
+        """
+        from stats import mongo, graphs, refresh
+
+        for name in (
+            "latest_server_metrics",
+            "latest_metrics_timestamp",
+            "online_players",
+            "find_player",
+            "find_duels",
+            "metric_series",
+            "metric_buckets",
+        ):
+            setattr(mongo, name, getattr(self, name))
+        graphs.metric_series = self.metric_series
+        graphs.metric_buckets = self.metric_buckets
+        refresh.latest_metrics_timestamp = self.latest_metrics_timestamp
@@ -0,0 +1,194 @@
+"""
+Offline benchmarks for the stats and graph hot paths.
+
+    python -m bench.run                         # in-memory store, 1k..1M docs
+    python -m bench.run --sizes 1000 10000000   # up to 10M samples
+    python -m bench.run --mongo-uri mongodb://localhost:27017 --sizes 100000
+    python -m bench.run --compare <commit>      # diff against a saved run
+
+GCE, mcstatus, Crafty and the stats ping are stubbed out. Results are saved
+to `bench/results/<commit>.json` so runs can be compared across commits.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+GRAPH_WINDOWS = [60, 1440, 10080]
+
+
+def _git(*args):
+    try:
+        return subprocess.check_output(["git", *args], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _commit():
+    sha = _git("rev-parse", "--short", "HEAD") or "unknown"
+    return sha + ("-dirty" if _git("status", "--porcelain", "--untracked-files=no") else "")
+
+
+def _summary(samples, wall):
+    samples = sorted(samples)
+    pick = lambda pct: samples[min(len(samples) - 1, int(pct / 100 * len(samples)))]
+    return {
+        "n": len(samples),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+        "p50_ms": round(pick(50) * 1000, 3),
+        "p95_ms": round(pick(95) * 1000, 3),
+        "p99_ms": round(pick(99) * 1000, 3),
+        "ops_per_s": round(len(samples) / wall, 1) if wall else None,
+    }
+
+
+async def _measure(run, iterations, warmup):
+    for _ in range(warmup):
+        await run()
+    samples = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await run()
+        samples.append(time.perf_counter() - start)
+    return _summary(samples, time.perf_counter() - started)
+
+
+async def _bench_size(main, iterations, warmup):
+    from bench import fakes, seed
+    from stats import graphs
+
+    results = {}
+    player = seed.player_name(7)
+
+    def handler(name, **params):
+        async def run():
+            interaction = fakes.FakeInteraction()
+            await fakes.invoke(main, name, interaction, **params)
+            if not interaction.replies:
+                raise RuntimeError(f"/{name} sent nothing")
+        return run
+
+    async def stats_server():
+        interaction = fakes.FakeInteraction()
+        await main.stats_server(interaction)
+
+    async def stats_player():
+        interaction = fakes.FakeInteraction()
+        await main.stats_player(interaction, player)
+
+    results["stats_server"] = await _measure(stats_server, iterations, warmup)
+    results["stats_player"] = await _measure(stats_player, iterations, warmup)
+    results["duels"] = await _measure(handler("duels", username=player), iterations, warmup)
+    results["players_cmd"] = await _measure(handler("players"), iterations, warmup)
+
+    for minutes in GRAPH_WINDOWS:
+        spec = graphs.METRICS["cpu_sys"]
+
+        async def cold():
+            # A fresh cache per call measures the query + render path.
+            graphs._graph_cache = graphs.RenderCache(graphs.GRAPH_CACHE_MAX_BYTES)
+            await graphs.plot_metric(spec[0], minutes, *spec[1:])
+
+        async def warm():
+            await graphs.plot_metric(spec[0], minutes, *spec[1:])
+
+        render_iterations = max(3, iterations // 10)
+        results[f"plot_metric_{minutes}m"] = await _measure(cold, render_iterations, 1)
+        results[f"plot_metric_{minutes}m_cached"] = await _measure(warm, iterations, warmup)
+
+    return results
+
+
+async def _run(args):
+    import main
+    from bench import fakes
+    from bench.memstore import MemStore
+    from bench.seed import seed_mongo, roll_up_seeded
+    from stats import graphs
+
+    report = {
+        "commit": _commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "backend": "mongo" if args.mongo_uri else "memory",
+        "python": sys.version.split()[0],
+        "sizes": {},
+    }
+    try:
+        with fakes.stub_backends(main):
+            for size in args.sizes:
+                print(f"[BENCH] Seeding {size:,} metric samples ({report['backend']})")
+                if args.mongo_uri:
+                    seed_mongo(args.mongo_uri, args.mongo_db, size)
+                    await roll_up_seeded()
+                else:
+                    MemStore(size).install()
+                report["sizes"][str(size)] = await _bench_size(main, args.iterations, args.warmup)
+                _print_size(size, report["sizes"][str(size)])
+    finally:
+        graphs.shutdown_render_pool()
+    return report
+
+
+def _print_size(size, results):
+    print(f"\n{size:,} docs")
+    print(f"  {'target':<26}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>10}")
+    for name, stats in results.items():
+        print(
+            f"  {name:<26}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+            f"{stats['p99_ms']:>10.2f}{stats['ops_per_s'] or 0:>10.1f}"
+        )
+
+
+def _compare(report, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\n[BENCH] p50 change vs {baseline['commit']}")
+    for size, results in report["sizes"].items():
+        before = baseline["sizes"].get(size, {})
+        for name, stats in results.items():
+            if name in before and before[name]["p50_ms"]:
+                change = (stats["p50_ms"] / before[name]["p50_ms"] - 1) * 100
+                print(f"  {int(size):>12,} {name:<26}{change:>+8.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--mongo-uri", help="Seed and query a real (disposable) MongoDB instead")
+    parser.add_argument("--mongo-db", default="mcbot_bench")
+    parser.add_argument("--compare", help="Commit (or results file) to compare against")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    # main.py reads these at import time.
+    os.environ.setdefault("TRACE_LOG", "0")
+    os.environ["MONGO_URI"] = args.mongo_uri or "mongodb://localhost:27017"
+    os.environ["MONGO_DB"] = args.mongo_db
+
+    report = asyncio.run(_run(args))
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{report['commit']}.json")
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n[BENCH] Saved {path}")
+
+    if args.compare:
+        baseline = args.compare
+        if not os.path.exists(baseline):
+            baseline = os.path.join(RESULTS_DIR, f"{args.compare}.json")
+        _compare(report, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Synthetic data shaped like what the server plugin pushes: a `server_metrics`
+sample every 10 seconds (with offline gaps), `players` and `duels` records.
+
+Generation is seeded, so every run and every commit sees identical data.
+"""
+from datetime import datetime
+import numpy as np
+
+SAMPLE_SECONDS = 10
+# One simulated restart/outage per this many samples, lasting OUTAGE_SAMPLES.
+OUTAGE_EVERY = 8640
+OUTAGE_SAMPLES = 90
+
+GB = 1024**3
+# Counters and sizes are integers in the real documents; gauges are floats.
+INT_FIELDS = {
+    "player_count",
+    "loaded_chunks",
+    "total_joins",
+    "total_unique_joins",
+    "total_deaths",
+    "uptime_ms",
+    "total_runtime_ms",
+}
+MODES = ["sword", "axe", "uhc", "pot"]
+
+
+def player_count_for(docs):
+    """
+    Players/duels collection size for a run with `docs` metric samples.
+    """
+    return max(100, docs // 100)
+
+
+def metric_columns(docs, end=None, seed=0):
+    """
+    `docs` metric samples as NumPy columns ending at `end` (default now),
+    oldest first.
+
+    Returns:
+        dict: `timestamp` (datetime64[ms]) plus one int64 or float32 array
+        per field.
+    """
+    rng = np.random.default_rng(seed)
+    end = np.datetime64(end or datetime.utcnow(), "ms")
+
+    # Slots are SAMPLE_SECONDS apart; every OUTAGE_EVERY slots, OUTAGE_SAMPLES
+    # are skipped so plots have realistic gaps.
+    index = np.arange(docs, dtype=np.int64)
+    slots = index + (index // (OUTAGE_EVERY - OUTAGE_SAMPLES)) * OUTAGE_SAMPLES
+    step = np.timedelta64(SAMPLE_SECONDS * 1000, "ms")
+    timestamps = end - (slots[-1] - slots) * step if docs else np.array([], "datetime64[ms]")
+
+    day = (slots * SAMPLE_SECONDS / 86400.0) * 2 * np.pi
+    players = np.clip(np.round(8 + 7 * np.sin(day) + rng.normal(0, 1.5, docs)), 0, 40)
+
+    columns = {
+        "timestamp": timestamps,
+        "player_count": players,
+        "loaded_chunks": 400 + players * 180 + rng.normal(0, 40, docs),
+        "cpu_system_pct": np.clip(15 + players * 2.5 + rng.normal(0, 6, docs), 0, 100),
+        "cpu_jvm_pct": np.clip(10 + players * 2 + rng.normal(0, 5, docs), 0, 100),
+        "ram_system_used": 5 * GB + players * 0.05 * GB + rng.normal(0, 0.1 * GB, docs),
+        "ram_system_total": np.full(docs, 16 * GB),
+        "jvm_heap_used": 2 * GB + rng.uniform(0, 2 * GB, docs),
+        "jvm_heap_max": np.full(docs, 6 * GB),
+        "jvm_rss_used": 4 * GB + players * 0.02 * GB + rng.normal(0, 0.05 * GB, docs),
+        "total_joins": np.cumsum(rng.poisson(0.05, docs)),
+        "total_unique_joins": np.cumsum(rng.poisson(0.005, docs)),
+        "total_deaths": np.cumsum(rng.poisson(0.02, docs)),
+        "uptime_ms": (index % (OUTAGE_EVERY - OUTAGE_SAMPLES)) * SAMPLE_SECONDS * 1000,
+        "total_runtime_ms": index * SAMPLE_SECONDS * 1000,
+    }
+    for field, values in columns.items():
+        if field in INT_FIELDS:
+            columns[field] = np.round(values).astype(np.int64)
+        elif field != "timestamp":
+            columns[field] = values.astype(np.float32)
+    return columns
+
+
+def metric_documents(columns, start=0, stop=None):
+    """
+    Rows `[start, stop)` of `columns` as `server_metrics` documents.
+    """
+    stop = len(columns["timestamp"]) if stop is None else stop
+    fields = [field for field in columns if field != "timestamp"]
+    times = columns["timestamp"][start:stop].tolist()
+    values = {field: columns[field][start:stop].tolist() for field in fields}
+    docs = []
+    for i, timestamp in enumerate(times):
+        doc = {"timestamp": timestamp}
+        for field in fields:
+            doc[field] = values[field][i]
+        docs.append(doc)
+    return docs
+
+
+def player_name(i):
+    return f"Player{i:07d}"
+
+
+def player_documents(count, online=20, seed=1):
+    """
+    `count` player stat documents; the first `online` are flagged online.
+    """
+    rng = np.random.default_rng(seed)
+    now_ms = int(datetime.utcnow().timestamp() * 1000)
+    docs = []
+    for i in range(count):
+        first_join = now_ms - int(rng.integers(1, 365)) * 86_400_000
+        docs.append(
+            {
+                "uuid": f"00000000-0000-4000-8000-{i:012d}",
+                "name": player_name(i),
+                "online": i < online,
+                "total_playtime_ms": int(rng.integers(0, 500)) * 3_600_000,
+                "total_joins": int(rng.integers(1, 400)),
+                "total_deaths": int(rng.integers(0, 300)),
+                "player_kills": int(rng.integers(0, 200)),
+                "mob_kills": int(rng.integers(0, 5000)),
+                "blocks_broken": int(rng.integers(0, 100_000)),
+                "blocks_placed": int(rng.integers(0, 100_000)),
+                "villager_trades": int(rng.integers(0, 500)),
+                "animals_bred": int(rng.integers(0, 500)),
+                "advancements": int(rng.integers(0, 120)),
+                "messages_sent": int(rng.integers(0, 3000)),
+                "first_join_ts": first_join,
+                "last_seen_ts": now_ms - int(rng.integers(0, 86_400_000)),
+            }
+        )
+    return docs
+
+
+def duel_documents(count, seed=2):
+    """
+    `count` duel records, one per player name.
+    """
+    rng = np.random.default_rng(seed)
+    docs = []
+    for i in range(count):
+        wins, losses = int(rng.integers(0, 300)), int(rng.integers(0, 300))
+        docs.append(
+            {
+                "name": player_name(i),
+                "wins": wins,
+                "losses": losses,
+                "total_matches": wins + losses,
+                "rating": {mode: int(rng.integers(800, 2400)) for mode in MODES},
+            }
+        )
+    return docs
+
+
+def seed_mongo(uri, db_name, docs, batch=50_000):
+    """
+    Replace `server_metrics`, `players` and `duels` in a real MongoDB with
+    synthetic data and build the bot's indexes.
+
+    Args:
+        uri: Connection string of a local, disposable MongoDB.
+        db_name: Database to (re)populate.
+        docs: Number of `server_metrics` samples.
+        batch: Documents per `insert_many`.
+    """
+    from pymongo import MongoClient, ASCENDING
+    from pymongo.collation import Collation
+
+    client = MongoClient(uri)
+    db = client[db_name]
+    for name in ("server_metrics", "server_metrics_1m", "server_metrics_1h", "players", "duels"):
+        db.drop_collection(name)
+
+    columns = metric_columns(docs)
+    for start in range(0, docs, batch):
+        db.server_metrics.insert_many(metric_documents(columns, start, start + batch), ordered=False)
+
+    count = player_count_for(docs)
+    for collection, generated in (("players", player_documents(count)), ("duels", duel_documents(count))):
+        for start in range(0, count, batch):
+            db[collection].insert_many(generated[start : start + batch], ordered=False)
+        db[collection].create_index(
+            [("name", ASCENDING)], name="name_ci", collation=Collation(locale="en", strength=2)
+        )
+    db.players.create_index([("last_seen_ts", ASCENDING)])
+    for name in ("server_metrics", "server_metrics_1m", "server_metrics_1h"):
+        db[name].create_index([("timestamp", ASCENDING)])
+    client.close()
+
+
+async def roll_up_seeded():
+    """
+    Fill the 1-minute and 1-hour tiers from freshly seeded raw samples with
+    the bot's own rollup, so long graph windows read real rollup documents.
+    Call after `seed_mongo`, with `MONGO_URI`/`MONGO_DB` pointing at the
+    same database.
+    """
+    from stats import rollup
+
+    # The tiers were just dropped, so forget buckets rolled for a previous
+    # size. TTL retention is skipped: seeded history spans months and must
+    # not expire mid-run.
+    rollup._watermarks.clear()
+    rollup._retention_applied = True
+    await rollup.run_rollups()
@@ -0,0 +1,11 @@
+"""
+Entry point: `python bot.py`.
+
+Graph render workers re-import whatever script launched the process, so this
+one does nothing unless it is run directly. That keeps Discord, Mongo and
+the rest of `main.py` out of the workers.
+"""
+if __name__ == "__main__":
+    import main
+
+    main.run()
@@ -0,0 +1,137 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+
+import telemetry
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+HEARTBEAT_SECONDS = 0.1
+# A callback holding the loop longer than this is reported as a stall.
+STALL_THRESHOLD_SECONDS = float(os.getenv("LOOP_STALL_THRESHOLD", "0.2"))
+# Innermost frames printed per stall; the call site is picked from the full stack.
+STACK_DEPTH = 12
+
+
+def _callback_frames(stack):
+    """
+    Drop the event loop's own frames, keeping the callback that was running.
+    """
+    for i in range(len(stack) - 1, -1, -1):
+        frame = stack[i]
+        if frame.name == "_run" and frame.filename.endswith(os.path.join("asyncio", "events.py")):
+            return stack[i + 1 :] or stack
+    return stack
+
+
+def _call_site(stack):
+    """
+    Innermost frame in the bot's own code, falling back to the innermost
+    frame overall (e.g. a stall entirely inside a library callback).
+    """
+    for frame in reversed(stack):
+        path = os.path.abspath(frame.filename)
+        if path.startswith(BASE_DIR) and "site-packages" not in path:
+            return f"{os.path.relpath(path, BASE_DIR)}:{frame.lineno} in {frame.name}"
+    frame = stack[-1]
+    return f"{os.path.basename(frame.filename)}:{frame.lineno} in {frame.name}"
+
+
+class LoopWatchdog:
+    """
+    STACK: Telemetry
+    Event loop stall detector. A heartbeat callback on the loop records how
+    late it runs (event loop lag); a monitor thread notices when the
+    heartbeat is overdue, snapshots the loop thread's stack with
+    `sys._current_frames()` and, once the loop recovers, the stall is
+    logged with its duration and counted per call site.
+
+    Costs one timer callback per `interval` on the loop and one thread
+    wake-up per half interval, so it stays on in production.
+
+    Args:
+        threshold: Seconds the loop must be blocked to count as a stall.
+        interval: Heartbeat period in seconds.
+    """
+
+    def __init__(self, threshold=STALL_THRESHOLD_SECONDS, interval=HEARTBEAT_SECONDS):
+        self.threshold = threshold
+        self.interval = interval
+        self._loop = None
+        self._loop_thread = None
+        self._handle = None
+        self._thread = None
+        self._stopped = threading.Event()
+        self._beat = 0.0
+        # Written by the monitor thread, consumed by the next heartbeat.
+        self._pending = None
+        self._captured_beat = None
+
+    def start(self):
+        """
+        Start watching the running loop. Call from a coroutine on that loop.
+        """
+        if self._thread is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._stopped.clear()
+        self._beat = time.monotonic()
+        self._handle = self._loop.call_later(self.interval, self._heartbeat)
+        self._thread = threading.Thread(target=self._monitor, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the heartbeat and the monitor thread.
+        """
+        self._stopped.set()
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def _heartbeat(self):
+        now = time.monotonic()
+        lag = max(0.0, now - self._beat - self.interval)
+        telemetry.loop_lag.observe(lag)
+        telemetry.loop_lag_last.set(round(lag, 6))
+
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            self._report(lag, pending)
+
+        self._beat = now
+        self._handle = self._loop.call_later(self.interval, self._heartbeat)
+
+    def _monitor(self):
+        while not self._stopped.wait(self.interval / 2):
+            beat = self._beat
+            overdue = time.monotonic() - beat - self.interval
+            if overdue < self.threshold or self._captured_beat == beat:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            stack = _callback_frames(traceback.extract_stack(frame))
+            del frame
+            self._captured_beat = beat
+            self._pending = stack
+
+    def _report(self, duration, stack):
+        site = _call_site(stack)
+        telemetry.loop_stalls.inc(site=site)
+        telemetry.loop_stall_duration.observe(duration)
+
+        print(f"[WATCHDOG] Event loop blocked for {duration * 1000:.0f} ms at {site}")
+        for line in traceback.format_list(stack[-STACK_DEPTH:]):
+            print(f"[WATCHDOG]   {line.rstrip()}".replace("\n", "\n[WATCHDOG]   "))
+
+
+watchdog = LoopWatchdog()
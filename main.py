@@ -1,38 +1,106 @@
 import os
 from dotenv import load_dotenv
-
-import discord
-from discord.ext import commands, tasks
-from discord import app_commands
 import asyncio
+import hashlib
+import io
+import json
+import time
 from datetime import datetime, timezone
 
-from utils import (
-    is_admin,
-    get_player_count,
-    start_vm,
-    stop_vm,
-    stop_mc_server,
-    get_vm_status,
-    format_duration,
-    gb,
-    ping_stats,
-)
+import startup
+
+with startup.phase("import discord"):
+    import discord
+    from discord.ext import commands, tasks
+    from discord import app_commands
+
+with startup.phase("import utils"):
+    from utils import (
+        is_admin,
+        get_player_count,
+        start_vm,
+        stop_vm,
+        stop_mc_server,
+        get_vm_status,
+        format_duration,
+        gb,
+        open_http_session,
+        close_http_session,
+        GUILD_ID,
+        COMMAND_HASH_PATH,
+        with_deadline,
+        STATS_REFRESH_BUDGET,
+        STATS_DEADLINE,
+    )
 
-from stats.graphs import plot_metric
-from stats.mongo import server_metrics, players, duels_db
-from datetime import datetime, timezone
+from scheduler import AdaptiveLoop
+import telemetry
+import tracing
+from loop_watchdog import watchdog
+from tracing import traced
+
+with startup.phase("import stats"):
+    from stats.graphs import plot_metrics, shutdown_render_pool, METRICS, MAX_METRICS_PER_GRAPH
+    from stats.rollup import run_rollups
+    from stats import mongo
+    from stats.names import player_names, duel_names, refresh_name_indexes
+    from stats.refresh import refresh_stats, refresh_player
+    from webserver import start_webserver, stop_webserver
 
 load_dotenv()
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 
+
+class InstrumentedTree(app_commands.CommandTree):
+    """
+    STACK: Telemetry
+    Command tree that stamps each interaction on receipt and starts its
+    trace, so completion and error hooks can record per-command latency.
+    """
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        interaction.extras["received_at"] = time.perf_counter()
+        if interaction.type is discord.InteractionType.application_command and interaction.command:
+            receipt = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+            interaction.extras["trace"] = tracing.start(interaction.command.qualified_name, receipt)
+        return True
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        record_command_latency(interaction, "error")
+        await super().on_error(interaction, error)
+
+
+def record_command_latency(interaction, status):
+    received_at = interaction.extras.get("received_at")
+    if received_at is None or interaction.command is None:
+        return
+    telemetry.command_duration.observe(
+        time.perf_counter() - received_at,
+        command=interaction.command.qualified_name,
+        status=status,
+    )
+    trace = interaction.extras.pop("trace", None)
+    if trace is not None:
+        tracing.finish(trace, status)
+
+
 intents = discord.Intents.default()
 intents.message_content = True
-bot = commands.Bot(command_prefix="$", intents=intents, help_command=None)
+bot = commands.Bot(
+    command_prefix="$", intents=intents, help_command=None, tree_cls=InstrumentedTree
+)
 tree = bot.tree
 empty_time = None
 trigger_shutdown = False
 
+EMPTY_SHUTDOWN_SECONDS = 300
+POLL_MIN_SECONDS = 5
+POLL_TRANSITION_SECONDS = 10
+POLL_EMPTY_MAX_SECONDS = 30
+POLL_PLAYERS_ONLINE_SECONDS = 60
+POLL_STOPPED_MAX_SECONDS = 600
+stopped_poll_delay = POLL_TRANSITION_SECONDS
+
 VOTE_EMOJI = "👍"
 REQUIRED_VOTES = 4
 
@@ -91,6 +159,25 @@ def embed_started():
     ).set_footer(text="Xymic")
 
 
+def embed_start_slow():
+    """
+    STACK: Discord information
+    Send an `Embed` acknowledgment when the VM takes longer than expected to boot.
+
+    Returns:
+        Embed (Discord obj)
+    """
+    return discord.Embed(
+        title=f"{CLOCK} Still Booting",
+        description=(
+            "The VM is taking longer than usual to start.\n"
+            "Check `/stats server` again in a minute."
+        ),
+        color=discord.Color.gold(),
+        timestamp=datetime.now(timezone.utc),
+    ).set_footer(text="Xymic")
+
+
 def embed_manual_stop():
     """
     STACK: Discord information
@@ -207,15 +294,83 @@ def embed_vm_stop():
     ).set_footer(text="Xymic")
 
 
+async def sync_command_tree():
+    """
+    STACK: Discord Bot
+    Sync slash commands only when their definitions changed since the last
+    sync. The hash of the command payload is kept in `COMMAND_HASH_PATH`.
+    With `GUILD_ID` set, commands are registered on that guild (instant
+    propagation) and the global set is emptied.
+    """
+    guild = discord.Object(id=int(GUILD_ID)) if GUILD_ID else None
+    if guild:
+        tree.copy_global_to(guild=guild)
+        tree.clear_commands(guild=None)
+
+    payload = [command.to_dict(tree) for command in tree.get_commands(guild=guild)]
+    digest = hashlib.sha256(
+        json.dumps({"guild": GUILD_ID, "commands": payload}, sort_keys=True).encode()
+    ).hexdigest()
+
+    try:
+        with open(COMMAND_HASH_PATH) as f:
+            previous = f.read().strip()
+    except FileNotFoundError:
+        previous = None
+
+    if digest == previous:
+        print("[DISCORD BOT] Command tree unchanged, skipping sync")
+        return
+
+    if guild:
+        await tree.sync(guild=guild)
+    await tree.sync()
+    print(f"[DISCORD BOT] Synced {len(payload)} commands")
+
+    with open(COMMAND_HASH_PATH, "w") as f:
+        f.write(digest)
+
+
+@bot.event
+async def setup_hook():
+    """
+    STACK: Discord Bot
+    One-time setup before the gateway connects: open shared clients, start
+    the web server, make sure the Mongo lookup indexes exist, sync commands
+    if they changed and start the background loops. Unlike `on_ready`, this
+    never re-runs on gateway reconnects.
+    """
+    with startup.phase("setup_hook"):
+        watchdog.start()
+        await open_http_session()
+        await start_webserver(bot, server_poller)
+        try:
+            await mongo.ensure_indexes()
+        except Exception as e:
+            print(f"[STATS] Failed to ensure Mongo indexes: {e}")
+        try:
+            await sync_command_tree()
+        except discord.HTTPException as e:
+            print(f"[DISCORD BOT] Command sync failed: {e}")
+        refresh_names.start()
+        rollup_metrics.start()
+        server_poller.start()
+
+
 @bot.event
 async def on_ready():
     """
     STACK: Discord Bot
-    Login acknowledgement and start timers for `check_server`
+    Login acknowledgement. Fires again after every gateway reconnect, so it
+    does no setup work.
     """
-    await tree.sync()
     print(f"[DISCORD BOT] Logged in as {bot.user}")
-    check_server.start()
+    startup.mark_ready()
+
+
+@bot.event
+async def on_app_command_completion(interaction, command):
+    record_command_latency(interaction, "ok")
 
 @bot.event
 async def on_message(message):
@@ -267,7 +422,13 @@ async def on_reaction_add(reaction, user):
         current_votes.clear()
 
         await channel.send(embed=embed_starting())
-        await start_vm()
+        try:
+            await start_vm()
+        except TimeoutError:
+            await channel.send(embed=embed_start_slow())
+            return
+        finally:
+            wake_server_poller()
         await channel.send(embed=embed_started())
 
 
@@ -299,8 +460,14 @@ async def start(interaction: discord.Interaction):
 
     if is_admin(interaction):
         await interaction.response.send_message(embed=embed_starting(), ephemeral=True)
-        await start_vm()
-        await interaction.followup.send(embed=embed_started())
+        try:
+            await start_vm()
+        except TimeoutError:
+            await traced("followup.send", interaction.followup.send(embed=embed_start_slow()))
+            return
+        finally:
+            wake_server_poller()
+        await traced("followup.send", interaction.followup.send(embed=embed_started()))
         return
 
     if active_vote_message_id is not None:
@@ -337,36 +504,125 @@ async def stop(interaction: discord.Interaction):
         return
 
     await interaction.response.send_message(embed=embed_manual_stop())
-    await shutdown_server(manual=True)
+    try:
+        await shutdown_server(manual=True)
+    finally:
+        wake_server_poller()
 
-@tasks.loop(seconds=10)
 async def check_server():
     """
     STACK: Server control
-    Poll to check if server has no members for longer than a minute and shutdown accordingly.
+    Poll to check if server has no members for longer than five minutes and shutdown accordingly.
+
+    Returns:
+        float: Seconds until the next check. Backs off exponentially while
+        the VM is stopped, polls slowly while players are online and
+        tightens as the empty-server deadline approaches.
     """
-    global empty_time, trigger_shutdown
+    global empty_time, trigger_shutdown, stopped_poll_delay
     status = await get_vm_status()
 
-    if status == "RUNNING":
-        player_count = await get_player_count()
-        if player_count is None:
-            return
-
-        print(f"[SERVER CONTROL] Players online: {player_count}")
-        if player_count == 0:
-            if empty_time is None:
-                empty_time = datetime.now()
-            else:
-                elapsed = (datetime.now() - empty_time).total_seconds()
-                if elapsed >= 300 and not trigger_shutdown:
-                    trigger_shutdown = True
-                    await shutdown_server()
-        else:
-            empty_time = None
-            trigger_shutdown = False
-    else:
+    if status != "RUNNING":
+        empty_time = None
+        trigger_shutdown = False
+        if status != "TERMINATED":
+            # STAGING / STOPPING etc: the VM is about to change state.
+            return POLL_TRANSITION_SECONDS
         print("[SERVER CONTROL] Server is off")
+        delay = stopped_poll_delay
+        stopped_poll_delay = min(stopped_poll_delay * 2, POLL_STOPPED_MAX_SECONDS)
+        return delay
+
+    stopped_poll_delay = POLL_TRANSITION_SECONDS
+
+    player_count = await get_player_count()
+    if player_count is None:
+        return POLL_TRANSITION_SECONDS
+
+    print(f"[SERVER CONTROL] Players online: {player_count}")
+    if player_count > 0:
+        empty_time = None
+        trigger_shutdown = False
+        return POLL_PLAYERS_ONLINE_SECONDS
+
+    if empty_time is None:
+        empty_time = datetime.now()
+
+    remaining = EMPTY_SHUTDOWN_SECONDS - (datetime.now() - empty_time).total_seconds()
+    if remaining <= 0:
+        if not trigger_shutdown:
+            trigger_shutdown = True
+            await shutdown_server()
+        return POLL_TRANSITION_SECONDS
+
+    # Check twice as often as the time left, so the shutdown lands close to
+    # the deadline without polling every few seconds for five minutes.
+    return max(POLL_MIN_SECONDS, min(POLL_EMPTY_MAX_SECONDS, remaining / 2))
+
+
+server_poller = AdaptiveLoop("check_server", check_server)
+
+
+def wake_server_poller():
+    """
+    STACK: Server control
+    Reset the stopped-VM backoff and re-check the server right away.
+    Called after `/start` and `/stop` change the VM state.
+    """
+    global stopped_poll_delay
+    stopped_poll_delay = POLL_TRANSITION_SECONDS
+    server_poller.wake()
+
+
+@tasks.loop(seconds=60)
+async def refresh_names():
+    """
+    STACK: Stats
+    Keep the in-memory player name index used by autocomplete up to date.
+    """
+    try:
+        with telemetry.poll_duration.time(loop="refresh_names"):
+            await refresh_name_indexes()
+    except Exception as e:
+        print(f"[STATS] Failed to refresh player names: {e}")
+
+
+@tasks.loop(minutes=1)
+async def rollup_metrics():
+    """
+    STACK: Stats
+    Aggregate raw server metrics into the 1-minute and 1-hour rollup tiers.
+    """
+    try:
+        with telemetry.poll_duration.time(loop="rollup_metrics"):
+            await run_rollups()
+    except Exception as e:
+        print(f"[STATS] Metric rollup failed: {e}")
+
+
+def _available(result, what):
+    """
+    STACK: Stats
+    One result of `asyncio.gather(..., return_exceptions=True)`, or None if
+    that call failed, so a command can still answer with the rest.
+    """
+    if isinstance(result, Exception):
+        print(f"[STATS] {what} unavailable: {result!r}")
+        return None
+    return result
+
+
+async def _refresh_stats_quietly():
+    """
+    STACK: Stats
+    Best-effort stats refresh before a read; stored data is still served
+    if the ping fails.
+    """
+    try:
+        await with_deadline(refresh_stats(), STATS_REFRESH_BUDGET, shield=True)
+    except Exception as e:
+        print(f"[STATS] Refresh failed: {e!r}")
+
 
 @tree.command(name="players", description="List online players")
 async def players_cmd(interaction: discord.Interaction):
@@ -375,20 +631,39 @@ async def players_cmd(interaction: discord.Interaction):
     Lists all currently online players.
     """
 
-    status = await get_vm_status()
-    if status != "RUNNING":
+    await traced("defer", interaction.response.defer())
+
+    async def online():
+        await _refresh_stats_quietly()
+        return await mongo.online_players()
+
+    status, online_players = await asyncio.gather(
+        with_deadline(get_vm_status(), STATS_DEADLINE),
+        online(),
+        return_exceptions=True,
+    )
+    status = _available(status, "VM status")
+    online_players = _available(online_players, "Online players")
+
+    if status is not None and status != "RUNNING":
         embed = discord.Embed(
             title="🔴 Server Offline",
             description="The server is currently offline.",
             color=discord.Color.red(),
             timestamp=datetime.now(timezone.utc),
         )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        await traced("followup.send", interaction.followup.send(embed=embed))
         return
 
-    await ping_stats()
-
-    online_players = list(players.find({"online": True}))
+    if online_players is None:
+        embed = discord.Embed(
+            title="🟡 Player List Unavailable",
+            description="Couldn't load the player list right now. Try again in a moment.",
+            color=discord.Color.gold(),
+            timestamp=datetime.now(timezone.utc),
+        )
+        await traced("followup.send", interaction.followup.send(embed=embed))
+        return
 
     if not online_players:
         embed = discord.Embed(
@@ -397,7 +672,7 @@ async def players_cmd(interaction: discord.Interaction):
             color=discord.Color.gold(),
             timestamp=datetime.now(timezone.utc),
         )
-        await interaction.response.send_message(embed=embed)
+        await traced("followup.send", interaction.followup.send(embed=embed))
         return
 
     names = [doc.get("name", "Unknown") for doc in online_players]
@@ -410,7 +685,7 @@ async def players_cmd(interaction: discord.Interaction):
         timestamp=datetime.now(timezone.utc),
     )
 
-    await interaction.response.send_message(embed=embed)
+    await traced("followup.send", interaction.followup.send(embed=embed))
 
 
 @tree.command(name="stats", description="View server or player stats")
@@ -432,25 +707,30 @@ async def stats(interaction: discord.Interaction, mode: str, player: str = None)
         return
 
     if mode.lower() == "server":
-        await interaction.response.defer()
+        await traced("defer", interaction.response.defer())
         await stats_server(interaction)
     elif mode.lower() == "player":
         if not player:
             await interaction.response.send_message("Usage: `/stats player <username>`", ephemeral=True)
             return
-        await interaction.response.defer()
+        await traced("defer", interaction.response.defer())
         await stats_player(interaction, player)
     else:
         await interaction.response.send_message("Unknown option. Use `server` or `player`.", ephemeral=True)
 
 
+@stats.autocomplete("player")
+async def stats_player_autocomplete(interaction: discord.Interaction, current: str):
+    return [app_commands.Choice(name=name, value=name) for name in player_names.suggest(current)]
+
+
 @tree.command(name="graph", description="Show server performance graphs")
-@app_commands.describe(metric="Metric name", minutes="Time window in minutes")
+@app_commands.describe(metric="Metric name(s), comma-separated", minutes="Time window in minutes")
 async def graph(interaction: discord.Interaction, metric: str = None, minutes: int = 60):
     """
     STACK: Stats
     Usage:
-      /graph <metric> [minutes]
+      /graph <metric>[,<metric>...] [minutes]
 
     Metrics:
       players
@@ -466,7 +746,7 @@ async def graph(interaction: discord.Interaction, metric: str = None, minutes: i
 
     if not metric:
         await interaction.response.send_message(
-            "Usage: `/graph <metric> [minutes]`\n\n"
+            "Usage: `/graph <metric>[,<metric>...] [minutes]`\n\n"
             "**Available metrics:**\n"
             "`players`              : Players online\n"
             "`cpu_sys`              : System CPU %\n"
@@ -478,55 +758,40 @@ async def graph(interaction: discord.Interaction, metric: str = None, minutes: i
             "`joins`                : Total joins\n"
             "`uniq_joins`           : Total unique joins\n"
             "`deaths`               : Total deaths\n\n"
-            "Example:\n"
-            "`/graph cpu_sys 30`",
+            "Examples:\n"
+            "`/graph cpu_sys 30`\n"
+            "`/graph cpu_sys,cpu_jvm 60`",
             ephemeral=True
         )
         return
 
-    metric_map = {
-        "players": ("player_count", "Players Online", 1.0, None),
-        "chunks": ("loaded_chunks", "Loaded Chunks", 1.0, None),
-        "joins": ("total_joins", "Total Joins", 1.0, None),
-        "uniq_joins": ("total_unique_joins", "Total Unique Joins", 1.0, None),
-        "deaths": ("total_deaths", "Total Deaths", 1.0, None),
-        "cpu_sys": ("cpu_system_pct", "System CPU (%)", 1.0, (0, 100)),
-        "cpu": ("cpu_system_pct", "System CPU (%)", 1.0, (0, 100)),
-        "cpu_jvm": ("cpu_jvm_pct", "JVM CPU (%)", 1.0, (0, 100)),
-        "ram_sys": ("ram_system_used", "System RAM Used (GB)", 1 / (1024**3), None),
-        "ram": ("ram_system_used", "System RAM Used (GB)", 1 / (1024**3), None),
-        "ram_jvm": ("jvm_rss_used", "JVM RSS Used (GB)", 1 / (1024**3), None),
-        "heap": ("jvm_heap_used", "JVM Heap Used (GB)", 1 / (1024**3), None),
-    }
-
-    metric = metric.lower()
-
-    if metric not in metric_map:
-        await interaction.response.send_message(f"Unknown metric.\nAvailable: {', '.join(metric_map.keys())}", ephemeral=True)
+    names = [name.strip().lower() for name in metric.split(",") if name.strip()]
+    unknown = [name for name in names if name not in METRICS]
+
+    if not names or unknown:
+        await interaction.response.send_message(f"Unknown metric.\nAvailable: {', '.join(METRICS.keys())}", ephemeral=True)
         return
 
-    await interaction.response.defer()
+    # Aliases (cpu / cpu_sys) resolve to the same spec; draw each field once.
+    specs = list(dict.fromkeys(METRICS[name] for name in names))
+
+    if len(specs) > MAX_METRICS_PER_GRAPH:
+        await interaction.response.send_message(
+            f"You can graph at most {MAX_METRICS_PER_GRAPH} metrics at once.", ephemeral=True
+        )
+        return
 
-    col, label, scale, clamp = metric_map[metric]
+    await traced("defer", interaction.response.defer())
 
-    path = plot_metric(
-        col,
-        minutes=minutes,
-        ylabel=label,
-        scale=scale,
-        clamp=clamp,
-    )
+    png = await plot_metrics(specs, minutes=minutes)
 
-    if not path:
-        await interaction.followup.send("No data available for that time range.")
+    if not png:
+        await traced("followup.send", interaction.followup.send("No data available for that time range."))
         return
 
-    await interaction.followup.send(file=discord.File(path))
-
-    try:
-        os.remove(path)
-    except Exception as e:
-        print(f"[STATS] Failed to delete graph file {path}: {e}")
+    filename = "_".join(field for field, _, _, _ in specs) + ".png"
+    file = discord.File(io.BytesIO(png), filename=filename)
+    await traced("followup.send", interaction.followup.send(file=file))
 
 
 async def stats_server(interaction):
@@ -534,34 +799,49 @@ async def stats_server(interaction):
     STACK: Stats
     Fetches latest server statistics from MongoDB and returns a Discord embed.
     """
-    await ping_stats()
-    doc = server_metrics.find_one(sort=[("timestamp", -1)])
+    async def latest_metrics():
+        await _refresh_stats_quietly()
+        return await mongo.latest_server_metrics()
+
+    doc, status = await asyncio.gather(
+        latest_metrics(),
+        with_deadline(get_vm_status(), STATS_DEADLINE),
+        return_exceptions=True,
+    )
+    failed = isinstance(doc, Exception)
+    doc = _available(doc, "Server metrics")
+    status = _available(status, "VM status")
 
     if not doc:
         embed = discord.Embed(
             title="🔴 Minecraft Server Stats",
-            description="No data available.",
+            description="Couldn't load server stats right now. Try again in a moment."
+            if failed
+            else "No data available.",
             color=discord.Color.red(),
             timestamp=datetime.now(timezone.utc),
         )
-        await interaction.followup.send(embed=embed)
+        await traced("followup.send", interaction.followup.send(embed=embed))
         return
 
-    status = await get_vm_status()
-    offline = status != "RUNNING"
+    # None means the VM status lookup timed out or failed.
+    if status is None:
+        color = discord.Color.light_grey()
+        description = "⚪ Server status is **unknown**. Showing last known data."
+    elif status != "RUNNING":
+        color = discord.Color.red()
+        description = "🔴 Server is **offline**. Showing last known data."
+    else:
+        color = discord.Color.green()
+        description = "🟢 Server is **online**. Showing live data."
 
     embed = discord.Embed(
         title="Minecraft Server Stats",
-        color=discord.Color.red() if offline else discord.Color.green(),
+        description=description,
+        color=color,
         timestamp=datetime.now(timezone.utc),
     )
 
-    embed.description = (
-        "🔴 Server is **offline**. Showing last known data."
-        if offline
-        else "🟢 Server is **online**. Showing live data."
-    )
-
     embed.add_field(name="Players Online", value=doc.get("player_count", 0), inline=True)
     embed.add_field(name="Loaded Chunks", value=doc.get("loaded_chunks", 0), inline=True)
 
@@ -605,7 +885,7 @@ async def stats_server(interaction):
     embed.add_field(name="Uptime", value=format_duration(doc.get("uptime_ms", 0)), inline=True)
     embed.add_field(name="Total Runtime", value=format_duration(doc.get("total_runtime_ms", 0)), inline=True)
 
-    await interaction.followup.send(embed=embed)
+    await traced("followup.send", interaction.followup.send(embed=embed))
 
 
 async def stats_player(interaction, username):
@@ -613,17 +893,43 @@ async def stats_player(interaction, username):
     STACK: Stats
     Fetches individual player statistics based on username from MongoDB.
     """
-    await ping_stats()
-    doc = players.find_one({"name": {"$regex": f"^{username}$", "$options": "i"}})
-    true_deaths = doc.get("total_deaths", 0)
-    true_player_kills = doc.get("player_kills", 0)
+    async def player_doc():
+        doc = await mongo.find_player(username)
+        # Offline players' stats can't have changed; only ping for online ones.
+        if doc and doc.get("online") and doc.get("uuid"):
+            try:
+                refresh = refresh_player(doc["uuid"])
+                if await with_deadline(refresh, STATS_REFRESH_BUDGET, shield=True):
+                    doc = await mongo.find_player(username) or doc
+            except Exception as e:
+                print(f"[STATS] Player refresh failed: {e!r}")
+        return doc
+
+    doc, status = await asyncio.gather(
+        player_doc(),
+        with_deadline(get_vm_status(), STATS_DEADLINE),
+        return_exceptions=True,
+    )
+    failed = isinstance(doc, Exception)
+    doc = _available(doc, "Player stats")
+    status = _available(status, "VM status")
+
+    if failed:
+        await traced(
+            "followup.send",
+            interaction.followup.send("Couldn't load player stats right now. Try again in a moment."),
+        )
+        return
 
     if not doc:
-        await interaction.followup.send("Player not found.")
+        await traced("followup.send", interaction.followup.send("Player not found."))
         return
 
-    status = await get_vm_status() == "RUNNING"
-    online = bool(doc.get("online", False)) & status
+    true_deaths = doc.get("total_deaths", 0)
+    true_player_kills = doc.get("player_kills", 0)
+
+    # Trust the stored flag when the VM status is unknown.
+    online = bool(doc.get("online", False)) and status in ("RUNNING", None)
 
     embed = discord.Embed(
         title=f"Player Stats: {doc.get('name', 'Unknown')}",
@@ -661,7 +967,7 @@ async def stats_player(interaction, username):
 
     embed.set_footer(text=f"UUID: {doc.get('uuid', 'unknown')}")
 
-    await interaction.followup.send(embed=embed)
+    await traced("followup.send", interaction.followup.send(embed=embed))
 
 
 @tree.command(name="duels", description="Show duel statistics for a player")
@@ -676,13 +982,13 @@ async def duels(interaction: discord.Interaction, username: str = None):
         await interaction.response.send_message("Usage: `/duels <username>`", ephemeral=True)
         return
 
-    await interaction.response.defer()
-    await ping_stats()
+    await traced("defer", interaction.response.defer())
+    await with_deadline(refresh_stats(), STATS_REFRESH_BUDGET, shield=True)
 
-    doc = duels_db.find_one({"name": {"$regex": f"^{username}$", "$options": "i"}})
+    doc = await mongo.find_duels(username)
 
     if not doc:
-        await interaction.followup.send("No duel data found for that player.")
+        await traced("followup.send", interaction.followup.send("No duel data found for that player."))
         return
 
     embed = discord.Embed(
@@ -719,7 +1025,12 @@ async def duels(interaction: discord.Interaction, username: str = None):
 
     embed.set_footer(text="Duels stats are synced periodically from the server.")
 
-    await interaction.followup.send(embed=embed)
+    await traced("followup.send", interaction.followup.send(embed=embed))
+
+@duels.autocomplete("username")
+async def duels_autocomplete(interaction: discord.Interaction, current: str):
+    return [app_commands.Choice(name=name, value=name) for name in duel_names.suggest(current)]
+
 
 async def shutdown_server(manual=False):
     """
@@ -741,6 +1052,41 @@ async def shutdown_server(manual=False):
         await stop_vm()
         await channel.send(embed=embed_vm_stop())
 
+@tree.command(name="traces", description="Latency percentiles per command and phase")
+async def traces_cmd(interaction: discord.Interaction):
+    """
+    STACK: Telemetry
+    p50/p95/p99 of recent slash commands, broken down by phase (receipt,
+    defer, Mongo, stats ping, VM status, render, followup). Admin only.
+    """
+    if not is_admin(interaction):
+        await interaction.response.send_message(embed=embed_no_permission(), ephemeral=True)
+        return
+
+    summary = tracing.summarize()
+    embed = discord.Embed(
+        title="Command latency",
+        color=discord.Color.blurple(),
+        timestamp=datetime.now(timezone.utc),
+    )
+    if not summary:
+        embed.description = "No commands traced yet."
+
+    for command, phases in sorted(summary.items())[:25]:
+        lines = [f"{'phase':<14}{'p50':>7}{'p95':>7}{'p99':>7}{'n':>6}"]
+        ordered = sorted(phases.items(), key=lambda item: item[0] != "total")
+        for phase, stats in ordered:
+            lines.append(
+                f"{phase:<14}"
+                + "".join(f"{stats[f'p{pct}'] * 1000:>7.0f}" for pct in tracing.PERCENTILES)
+                + f"{stats['count']:>6}"
+            )
+        embed.add_field(name=f"/{command} (ms)", value="```" + "\n".join(lines) + "```", inline=False)
+
+    embed.set_footer(text=f"Last {tracing.TRACE_WINDOW} commands")
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
 @tree.command(name="help", description="Show all bot commands or details about one command/category")
 @app_commands.describe(target="Command name or category")
 async def help_cmd(interaction: discord.Interaction, target: str = None):
@@ -749,7 +1095,7 @@ async def help_cmd(interaction: discord.Interaction, target: str = None):
     Shows this message
     """
 
-    commands_list = tree.get_commands()
+    commands_list = tree.get_commands(guild=interaction.guild) or tree.get_commands()
 
     stacks = {}
     command_map = {}
@@ -856,4 +1202,29 @@ async def help_cmd(interaction: discord.Interaction, target: str = None):
     await interaction.response.send_message(embed=embed, ephemeral=False)
 
 
-bot.run(BOT_TOKEN)
+async def main():
+    async with bot:
+        try:
+            await bot.start(BOT_TOKEN)
+        finally:
+            watchdog.stop()
+            await stop_webserver()
+            await close_http_session()
+            await mongo.close()
+            shutdown_render_pool()
+
+
+def run():
+    """
+    STACK: Startup
+    Run the bot until it is stopped. Started from `bot.py`.
+    """
+    discord.utils.setup_logging()
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    run()
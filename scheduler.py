@@ -0,0 +1,69 @@
+import asyncio
+import time
+
+import telemetry
+
+
+class AdaptiveLoop:
+    """
+    STACK: Server control
+    Background loop whose interval is decided by each run. `tick()` returns
+    the number of seconds to sleep before the next run; `wake()` cuts the
+    current sleep short so a state change is picked up immediately.
+
+    Args:
+        name: Label used in log lines.
+        tick: Coroutine function returning the next delay in seconds.
+        error_delay: Delay used when `tick()` raises.
+
+    Attributes:
+        last_success: Unix time the last tick completed without raising.
+    """
+
+    def __init__(self, name, tick, error_delay=30):
+        self.name = name
+        self._tick = tick
+        self._error_delay = error_delay
+        self._wake = asyncio.Event()
+        self._task = None
+        self.last_success = None
+
+    def start(self):
+        """
+        Start the loop if it isn't already running.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name=self.name)
+
+    def stop(self):
+        """
+        Cancel the loop.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def wake(self):
+        """
+        Run the next tick now instead of waiting out the current delay.
+        """
+        self._wake.set()
+
+    async def _run(self):
+        while True:
+            # Cleared before the tick so a wake() during it triggers another run.
+            self._wake.clear()
+            try:
+                with telemetry.poll_duration.time(loop=self.name):
+                    delay = await self._tick()
+                self.last_success = time.time()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[SCHEDULER] {self.name} failed: {type(e).__name__}: {e}")
+                delay = self._error_delay
+
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=delay)
+            except TimeoutError:
+                pass
@@ -0,0 +1,43 @@
+import time
+from contextlib import contextmanager
+
+import telemetry
+
+_started = time.perf_counter()
+_phases = {}
+_ready_after = None
+
+
+@contextmanager
+def phase(name):
+    """
+    STACK: Startup
+    Time a block of startup work (an import group, `setup_hook`, ...).
+
+    Args:
+        name: Label shown in the startup profile.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases[name] = time.perf_counter() - start
+
+
+def mark_ready():
+    """
+    STACK: Startup
+    Record time-to-ready on the first `on_ready`, print the profile and
+    publish it as gauges on `/metrics`. Later calls (gateway reconnects)
+    are ignored.
+    """
+    global _ready_after
+    if _ready_after is not None:
+        return
+
+    _ready_after = time.perf_counter() - _started
+    for name, seconds in _phases.items():
+        print(f"[STARTUP] {name}: {seconds * 1000:.0f} ms")
+        telemetry.startup_phase.set(round(seconds, 4), phase=name)
+    print(f"[STARTUP] Ready in {_ready_after:.2f}s")
+    telemetry.startup_ready.set(round(_ready_after, 3))
@@ -1,155 +1,287 @@
-from stats.mongo import server_metrics
+from stats.mongo import metric_series, metric_buckets, TIERS
+from stats.render import render_png, metric_label, axis_unit
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
-import time
+import multiprocessing
+import asyncio
 import math
+import time
+import numpy as np
+import telemetry
+import tracing
 from datetime import timezone
 
 
 DEFAULT_PUSH_INTERVAL_SECONDS = 10
 GAP_MULTIPLIER = 2.2
 
-DARK_BG = "#0B0B0C"
-AX_BG = "#111113"
-GRID_COLOR = "#26262A"
-LINE_COLOR = "#ff8524"
-FILL_COLOR = "#E97112"
-TEXT_COLOR = "#E6E6E6"
+# Long windows are bucketed server-side so a plot never carries much more
+# than this many points (a 9" wide figure can't show more anyway).
+MAX_POINTS = 1000
+# A rollup tier is only used if it still yields at least this many points.
+MIN_TIER_POINTS = 240
+# Upper bound on metrics drawn in one `/graph` image.
+MAX_METRICS_PER_GRAPH = 4
 
+# pyplot keeps global figure state and isn't thread-safe, so renders go to
+# separate processes. Kept small: the host only has a couple of cores.
+RENDER_WORKERS = 2
+RENDER_TIMEOUT_SECONDS = 30
+
+# Rendered PNGs are reused until the next sample is due, so this only has to
+# hold the handful of graphs people ask for at the same time.
+GRAPH_CACHE_MAX_BYTES = 8 * 1024 * 1024
 
 BYTES_TO_GB = 1 / (1024**3)
 
+# `/graph` name -> (document field, axis label, scale, clamp)
+METRICS = {
+    "players": ("player_count", "Players Online", 1.0, None),
+    "chunks": ("loaded_chunks", "Loaded Chunks", 1.0, None),
+    "joins": ("total_joins", "Total Joins", 1.0, None),
+    "uniq_joins": ("total_unique_joins", "Total Unique Joins", 1.0, None),
+    "deaths": ("total_deaths", "Total Deaths", 1.0, None),
+    "cpu_sys": ("cpu_system_pct", "System CPU (%)", 1.0, (0, 100)),
+    "cpu": ("cpu_system_pct", "System CPU (%)", 1.0, (0, 100)),
+    "cpu_jvm": ("cpu_jvm_pct", "JVM CPU (%)", 1.0, (0, 100)),
+    "ram_sys": ("ram_system_used", "System RAM Used (GB)", BYTES_TO_GB, None),
+    "ram": ("ram_system_used", "System RAM Used (GB)", BYTES_TO_GB, None),
+    "ram_jvm": ("jvm_rss_used", "JVM RSS Used (GB)", BYTES_TO_GB, None),
+    "heap": ("jvm_heap_used", "JVM Heap Used (GB)", BYTES_TO_GB, None),
+}
+
 
-def _label(metric: str) -> str:
-    return metric.replace("_", " ").title()
+_render_pool = None
 
 
-def plot_metric(metric, minutes=60, ylabel=None, scale=1.0, clamp=None):
+class RenderCache:
     """
-    Plot for provided metric.
+    LRU of rendered PNGs bounded by total bytes. Keys carry the push-interval
+    bucket they were rendered in, so entries go stale when new data can have
+    arrived. Concurrent requests for the same key share one render.
 
     Args:
-        metric: The datatype to plot
-        minutes: How far back to plot
-        ylabel: The metric label
-        scale: Normaliziing factor
-        clamp: Minimum and maximum values on Y axis
+        max_bytes: Total PNG bytes to keep before evicting least recently used.
     """
 
-    since = datetime.utcnow() - timedelta(minutes=minutes)
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._inflight = {}
+
+    async def get_or_render(self, key, render):
+        """
+        Cached PNG for `key`, rendering it with `render()` on a miss.
+
+        Args:
+            key: Hashable key; its last element is the time bucket.
+            render: Coroutine function returning PNG bytes or None.
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(render())
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._finish(key, f))
+
+        return await asyncio.shield(future)
 
-    cursor = server_metrics.find(
-        {"timestamp": {"$gte": since}},
-        {"timestamp": 1, metric: 1},
-    ).sort("timestamp", 1)
+    def _finish(self, key, future):
+        self._inflight.pop(key, None)
+        if future.cancelled() or future.exception() is not None:
+            return
+        self._store(key, future.result())
 
-    times = []
-    values = []
+    def _store(self, key, png):
+        bucket = key[-1]
+        for stale in [k for k in self._entries if k[-1] < bucket]:
+            self._evict(stale)
 
-    last_ts = None
-    gap_threshold = timedelta(seconds=DEFAULT_PUSH_INTERVAL_SECONDS * GAP_MULTIPLIER)
+        size = len(png or b"")
+        if size > self.max_bytes:
+            return
 
-    for doc in cursor:
-        if metric not in doc:
+        self._entries[key] = png
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            self._evict(next(iter(self._entries)))
+
+    def _evict(self, key):
+        self._bytes -= len(self._entries.pop(key) or b"")
+
+
+_graph_cache = RenderCache(GRAPH_CACHE_MAX_BYTES)
+
+
+def _pick_tier(minutes):
+    """
+    Coarsest tier that still gives `MIN_TIER_POINTS` points over the window.
+    Windows longer than a tier's retention skip that tier entirely.
+    """
+    window = minutes * 60
+    chosen = TIERS[0]
+    for tier in TIERS:
+        if window / tier.seconds >= MIN_TIER_POINTS:
+            chosen = tier
+    for tier in TIERS:
+        if tier.seconds < chosen.seconds:
             continue
+        if tier.retention_days is None or window <= tier.retention_days * 24 * 3600:
+            return tier
+    return TIERS[-1]
 
-        ts = doc["timestamp"]
-        val = doc[metric] * scale
 
-        if clamp:
-            val = max(clamp[0], min(clamp[1], val))
+def _bucket_seconds(minutes, tier):
+    """
+    Bucket width that keeps `minutes` of data under `MAX_POINTS` points:
+    a whole multiple of the tier's own resolution.
+    """
+    buckets = math.ceil(minutes * 60 / MAX_POINTS / tier.seconds)
+    return max(1, buckets) * tier.seconds
 
-        if last_ts and (ts - last_ts) > gap_threshold:
-            times.append(ts)
-            values.append(float("nan"))
 
-        times.append(ts)
-        values.append(val)
-        last_ts = ts
+def _column(docs, key):
+    # Multi-metric rows can miss a field; np.array maps None to NaN.
+    return np.array([doc.get(key) for doc in docs], dtype=np.float64)
 
-    if not times:
-        return None
 
-    clean_times = []
-    clean_values = []
-    baseline = []
-
-    for t, v in zip(times, values):
-        clean_times.append(t)
-        clean_values.append(v)
-        baseline.append(0.0)
-
-    fig, ax = plt.subplots(figsize=(9, 4.5))
-    fig.patch.set_facecolor(DARK_BG)
-    ax.set_facecolor(AX_BG)
-
-    ax.plot(
-        times,
-        values,
-        color=LINE_COLOR,
-        linewidth=2.8,
-        solid_capstyle="round",
-        zorder=3,
-    )
+def _scaled(values, scale, clamp):
+    values = values * scale
+    if clamp:
+        np.clip(values, clamp[0], clamp[1], out=values)
+    return values
 
-    ax.fill_between(
-        times,
-        values,
-        0,
-        where=[not math.isnan(v) for v in values],
-        color=FILL_COLOR,
-        alpha=0.90,
-        interpolate=False,
-        zorder=2,
-    )
 
-    ax.grid(
-        True,
-        linestyle="--",
-        linewidth=0.6,
-        color=GRID_COLOR,
-        alpha=0.45,
-    )
+def _gap_positions(times, gap_seconds):
+    """
+    Indices where consecutive samples are further apart than `gap_seconds`.
+    A NaN point is inserted at each so matplotlib breaks the line across
+    downtime.
+    """
+    gap = np.timedelta64(int(gap_seconds * 1000), "ms")
+    return np.flatnonzero(np.diff(times) > gap) + 1
+
+
+def _get_render_pool():
+    global _render_pool
+    if _render_pool is None:
+        # Spawned workers re-run the bot's `__main__` module. A fork server
+        # that preloads only `stats.render` starts workers with just the
+        # drawing code; spawn remains the fallback where it is unavailable.
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload(["stats.render"])
+        else:
+            context = multiprocessing.get_context("spawn")
+        _render_pool = ProcessPoolExecutor(max_workers=RENDER_WORKERS, mp_context=context)
+    return _render_pool
+
+
+def shutdown_render_pool():
+    """
+    Stop the render worker processes. Called on bot shutdown.
+    """
+    global _render_pool
+    if _render_pool is not None:
+        _render_pool.shutdown(wait=False, cancel_futures=True)
+        _render_pool = None
 
-    ax.set_xlabel("Time", color=TEXT_COLOR, labelpad=8)
-    ax.set_ylabel(ylabel or _label(metric), color=TEXT_COLOR, labelpad=8)
 
-    ax.tick_params(
-        colors=TEXT_COLOR,
-        labelsize=9,
-        length=0,
-    )
+async def plot_metric(metric, minutes=60, ylabel=None, scale=1.0, clamp=None):
+    """
+    Plot for provided metric.
 
-    for spine in ax.spines.values():
-        spine.set_color(GRID_COLOR)
-        spine.set_linewidth(1.0)
-
-    ax.set_title(
-        f"{_label(metric)} · last {minutes} min",
-        color=TEXT_COLOR,
-        fontsize=12,
-        pad=12,
-        loc="left",
-        fontweight="bold",
-    )
+    Args:
+        metric: The datatype to plot
+        minutes: How far back to plot
+        ylabel: The metric label
+        scale: Normaliziing factor
+        clamp: Minimum and maximum values on Y axis
 
-    ax.plot(
-        times,
-        values,
-        color="#FF8C2A",
-        linewidth=5.0,
-        zorder=1,
-    )
+    Returns:
+        bytes: PNG image, or None if there is no data in the window.
+    """
+    return await plot_metrics([(metric, ylabel, scale, clamp)], minutes)
 
-    plt.tight_layout()
 
-    path = f"/tmp/{metric}_{int(time.time())}.png"
-    plt.savefig(
-        path,
-        dpi=140,
-        facecolor=fig.get_facecolor(),
-        bbox_inches="tight",
-    )
-    plt.close(fig)
+async def plot_metrics(specs, minutes=60):
+    """
+    Cached front for `_plot_metrics`. Identical requests within one push
+    interval get the same PNG, and concurrent ones wait on a single render.
+
+    Args:
+        specs: List of `(field, ylabel, scale, clamp)` tuples, as in `METRICS`.
+        minutes: How far back to plot
 
-    return path
+    Returns:
+        bytes: PNG image, or None if there is no data in the window.
+    """
+    specs = tuple(specs)
+    bucket = int(time.time() // DEFAULT_PUSH_INTERVAL_SECONDS)
+    key = (specs, minutes, bucket)
+    return await _graph_cache.get_or_render(key, lambda: _plot_metrics(specs, minutes))
+
+
+async def _plot_metrics(specs, minutes):
+    """
+    Fetch every metric in one query on the event loop, then draw them in the
+    render process pool: overlaid on one axis when they share a unit,
+    otherwise as stacked subplots sharing the time axis.
+    """
+    fields = [field for field, _, _, _ in specs]
+    since = datetime.utcnow() - timedelta(minutes=minutes)
+    tier = _pick_tier(minutes)
+    bucket_seconds = _bucket_seconds(minutes, tier)
+    bucketed = tier.rolled_up or bucket_seconds > tier.seconds
+
+    if bucketed:
+        docs = await metric_buckets(fields, since, bucket_seconds, tier)
+    else:
+        docs = await metric_series(fields, since)
+
+    if not docs:
+        return None
+
+    times = np.fromiter(
+        (doc["timestamp"] for doc in docs), dtype="datetime64[ms]", count=len(docs)
+    )
+    gaps = _gap_positions(times, bucket_seconds * GAP_MULTIPLIER)
+    times = np.insert(times, gaps, times[gaps])
+
+    series = []
+    for field, ylabel, scale, clamp in specs:
+        if bucketed:
+            values = _scaled(_column(docs, f"{field}__avg"), scale, clamp)
+            band = (
+                np.insert(_scaled(_column(docs, f"{field}__min"), scale, clamp), gaps, np.nan),
+                np.insert(_scaled(_column(docs, f"{field}__max"), scale, clamp), gaps, np.nan),
+            )
+        else:
+            values = _scaled(_column(docs, field), scale, clamp)
+            band = None
+
+        series.append(
+            {
+                "metric": field,
+                "ylabel": ylabel or metric_label(field),
+                "values": np.insert(values, gaps, np.nan),
+                "band": band,
+            }
+        )
+
+    units = {axis_unit(item["ylabel"]) for item in series}
+    overlay = len(series) > 1 and len(units) == 1 and None not in units
+
+    loop = asyncio.get_running_loop()
+    with telemetry.render_duration.time(), tracing.span("render"):
+        return await asyncio.wait_for(
+            loop.run_in_executor(
+                _get_render_pool(), render_png, times, series, minutes, overlay
+            ),
+            timeout=RENDER_TIMEOUT_SECONDS,
+        )
@@ -0,0 +1,239 @@
+from stats.mongo import server_metrics, players, MONGO_QUERY_TIMEOUT
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from datetime import datetime, timezone
+import pymongo
+import logging
+import math
+
+logger = logging.getLogger(__name__)
+
+# Flush when this many items are buffered, or every FLUSH_INTERVAL_SECONDS.
+FLUSH_BATCH_SIZE = 500
+FLUSH_INTERVAL_SECONDS = 1.0
+# Hard cap while Mongo is unreachable; the oldest items are dropped first.
+MAX_BUFFERED = 20_000
+
+# Numeric `server_metrics` fields the bot reads; other keys in a pushed
+# sample are dropped.
+METRIC_FIELDS = frozenset(
+    {
+        "player_count",
+        "loaded_chunks",
+        "cpu_system_pct",
+        "cpu_jvm_pct",
+        "ram_system_used",
+        "ram_system_total",
+        "jvm_heap_used",
+        "jvm_heap_max",
+        "jvm_rss_used",
+        "total_joins",
+        "total_unique_joins",
+        "total_deaths",
+        "uptime_ms",
+        "total_runtime_ms",
+    }
+)
+
+
+class IngestError(ValueError):
+    """
+    Raised for a malformed ingestion payload.
+    """
+
+
+def _parse_timestamp(value):
+    """
+    Accept epoch milliseconds or an ISO-8601 string; store naive UTC like
+    the rest of `server_metrics`.
+    """
+    if value is None:
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+    try:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return datetime.fromtimestamp(value / 1000, timezone.utc).replace(tzinfo=None)
+        if isinstance(value, str):
+            parsed = datetime.fromisoformat(value)
+            if parsed.tzinfo is not None:
+                parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+            return parsed
+    except (ValueError, OverflowError, OSError):
+        pass
+    raise IngestError(f"Invalid timestamp: {value!r}")
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _check_field_names(fields, where):
+    """
+    Reject keys Mongo would treat as operators or paths.
+    """
+    for key in fields:
+        if not isinstance(key, str) or not key or key.startswith("$") or "." in key:
+            raise IngestError(f"Invalid field name in `{where}`: {key!r}")
+
+
+def parse_metrics(samples):
+    """
+    Validate pushed metric samples into `server_metrics` documents.
+
+    Args:
+        samples: List of flat dicts, each with an optional `timestamp`.
+            Only `METRIC_FIELDS` are kept, and their values must be numbers.
+    """
+    if not isinstance(samples, list):
+        raise IngestError("`metrics` must be a list")
+
+    docs = []
+    for sample in samples:
+        if not isinstance(sample, dict):
+            raise IngestError("Each metric sample must be an object")
+        doc = {"timestamp": _parse_timestamp(sample.get("timestamp"))}
+        for field, value in sample.items():
+            if field not in METRIC_FIELDS:
+                continue
+            if not _is_number(value):
+                raise IngestError(f"`{field}` must be a number")
+            doc[field] = value
+        docs.append(doc)
+    return docs
+
+
+def parse_player_deltas(deltas):
+    """
+    Turn pushed player deltas into upserts on `players`, keyed by UUID.
+
+    Args:
+        deltas: List of `{"uuid", "set": {...}, "inc": {...}}` objects.
+    """
+    if not isinstance(deltas, list):
+        raise IngestError("`players` must be a list")
+
+    ops = []
+    for delta in deltas:
+        if not isinstance(delta, dict) or not isinstance(delta.get("uuid"), str):
+            raise IngestError("Each player delta needs a string `uuid`")
+
+        update = {}
+        for key, operator in (("set", "$set"), ("inc", "$inc")):
+            fields = delta.get(key) or {}
+            if not isinstance(fields, dict):
+                raise IngestError(f"`{key}` must be an object")
+            _check_field_names(fields, key)
+            fields = {k: v for k, v in fields.items() if k not in ("_id", "uuid")}
+            if key == "inc":
+                for field, value in fields.items():
+                    if not _is_number(value):
+                        raise IngestError(f"`inc.{field}` must be a number")
+            if fields:
+                update[operator] = fields
+        if not update:
+            continue
+
+        ops.append(UpdateOne({"uuid": delta["uuid"]}, update, upsert=True))
+    return ops
+
+
+class IngestBuffer:
+    """
+    Holding area between the ingestion route and Mongo. Items are drained in
+    batches and written with `insert_many` / `bulk_write`. Only touched from
+    the event loop, so it needs no locking.
+    """
+
+    def __init__(self, max_items=MAX_BUFFERED):
+        self.max_items = max_items
+        self._metrics = []
+        self._player_ops = []
+
+    def __len__(self):
+        return len(self._metrics) + len(self._player_ops)
+
+    def add(self, metrics, player_ops):
+        """
+        Queue parsed documents and player updates.
+
+        Returns:
+            int: Items now buffered.
+        """
+        self._metrics.extend(metrics)
+        self._player_ops.extend(player_ops)
+        self._trim()
+        return len(self)
+
+    def drain(self):
+        """
+        Take everything buffered so far.
+
+        Returns:
+            (metrics, player_ops)
+        """
+        metrics, self._metrics = self._metrics, []
+        ops, self._player_ops = self._player_ops, []
+        return metrics, ops
+
+    def requeue(self, metrics, player_ops):
+        """
+        Put a failed batch back in front of newer items.
+        """
+        self._metrics[:0] = metrics
+        self._player_ops[:0] = player_ops
+        self._trim()
+
+    def _trim(self):
+        overflow = len(self._metrics) + len(self._player_ops) - self.max_items
+        if overflow > 0:
+            dropped = min(overflow, len(self._metrics))
+            del self._metrics[:dropped]
+            del self._player_ops[: overflow - dropped]
+            logger.warning("Ingest buffer full, dropped %d oldest items", overflow)
+
+
+async def flush(buffer):
+    """
+    Write one drained batch to `server_metrics` and `players`. The two
+    writes are independent, so a rejected metric batch never costs the
+    player updates. Player updates stay ordered so repeated deltas for one
+    player apply in sequence; when one is rejected, the updates after it
+    (which Mongo never attempted) are requeued. Documents Mongo rejected
+    are logged and dropped, since retrying them would fail again or
+    duplicate writes that did land; anything that never reached Mongo is
+    requeued.
+
+    Returns:
+        int: Items written.
+    """
+    metrics, ops = buffer.drain()
+    written = 0
+
+    if metrics:
+        try:
+            with pymongo.timeout(MONGO_QUERY_TIMEOUT * 4):
+                await server_metrics.insert_many(metrics, ordered=False)
+            written += len(metrics)
+        except BulkWriteError as e:
+            written += e.details.get("nInserted", 0)
+            logger.error("Ingest metrics partially rejected: %s", e.details.get("writeErrors", [])[:3])
+        except BaseException:
+            # Also on cancellation (shutdown): the batch is already drained.
+            buffer.requeue(metrics, ops)
+            raise
+
+    if ops:
+        try:
+            with pymongo.timeout(MONGO_QUERY_TIMEOUT * 4):
+                await players.bulk_write(ops, ordered=True)
+            written += len(ops)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            failed = errors[0]["index"] if errors else len(ops) - 1
+            written += failed
+            logger.error("Ingest player update rejected: %s", errors[:1])
+            buffer.requeue([], ops[failed + 1 :])
+        except BaseException:
+            buffer.requeue([], ops)
+            raise
+
+    return written
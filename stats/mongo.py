@@ -1,4 +1,10 @@
-from pymongo import MongoClient
+from pymongo import AsyncMongoClient, ASCENDING
+from pymongo.collation import Collation
+from pymongo.errors import OperationFailure
+from pymongo import monitoring
+import pymongo
+import telemetry
+import tracing
 import os
 import logging
 
@@ -8,10 +14,383 @@ logger = logging.getLogger(__name__)
 MONGO_URI = os.getenv("MONGO_URI")
 MONGO_DB = os.getenv("MONGO_DB")
 
-client = MongoClient(MONGO_URI)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "20"))
+MONGO_QUERY_TIMEOUT = float(os.getenv("MONGO_QUERY_TIMEOUT", "3"))
+
+
+class _CommandTimer(monitoring.CommandListener):
+    """
+    Feed every command's server round-trip time into the backend latency
+    metrics, labelled by command name (`find`, `aggregate`, ...), and into
+    the current command trace.
+    """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        telemetry.observe_call("mongo", event.command_name, event.duration_micros / 1e6, True)
+        tracing.record("mongo", event.duration_micros / 1e6)
+
+    def failed(self, event):
+        telemetry.observe_call("mongo", event.command_name, event.duration_micros / 1e6, False)
+        tracing.record("mongo", event.duration_micros / 1e6)
+
+
+client = AsyncMongoClient(
+    MONGO_URI,
+    event_listeners=[_CommandTimer()],
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    minPoolSize=1,
+    maxIdleTimeMS=5 * 60 * 1000,
+    connectTimeoutMS=3000,
+    serverSelectionTimeoutMS=3000,
+)
 db = client[MONGO_DB]
 
 server_metrics = db.server_metrics
 players = db.players
 duels_db = db.duels
 
+
+class Tier:
+    """
+    One resolution level of `server_metrics` data.
+
+    Args:
+        collection: Collection holding this tier.
+        seconds: Width of one sample/bucket.
+        retention_days: Age after which Mongo's TTL monitor drops documents
+            (None keeps them forever).
+        rolled_up: Whether documents hold `{min, max, avg, last}` per metric
+            rather than raw values.
+    """
+
+    def __init__(self, collection, seconds, retention_days, rolled_up):
+        self.collection = collection
+        self.seconds = seconds
+        self.retention_days = retention_days
+        self.rolled_up = rolled_up
+
+
+RAW_TIER = Tier(server_metrics, 10, int(os.getenv("METRICS_RAW_RETENTION_DAYS", "14")), False)
+MINUTE_TIER = Tier(db.server_metrics_1m, 60, int(os.getenv("METRICS_1M_RETENTION_DAYS", "90")), True)
+HOUR_TIER = Tier(db.server_metrics_1h, 3600, None, True)
+TIERS = [RAW_TIER, MINUTE_TIER, HOUR_TIER]
+
+# Strength 2 compares case-insensitively, so "Steve" and "steve" hit the same
+# index entry. Queries must pass the same collation to use the index.
+NAME_COLLATION = Collation(locale="en", strength=2)
+
+
+async def ensure_indexes():
+    """
+    Create the indexes the bot's lookups depend on. Safe to call on every
+    startup; existing indexes are left untouched.
+    """
+    for collection in (players, duels_db):
+        await collection.create_index(
+            [("name", ASCENDING)], name="name_ci", collation=NAME_COLLATION
+        )
+    # Name refreshes fetch only players whose `last_seen_ts` moved.
+    await players.create_index([("last_seen_ts", ASCENDING)])
+
+    for tier in TIERS:
+        # Once `ensure_retention` has made this a TTL index, creating it
+        # again without `expireAfterSeconds` fails with IndexOptionsConflict.
+        if "timestamp_1" not in await tier.collection.index_information():
+            await tier.collection.create_index([("timestamp", ASCENDING)])
+
+
+async def ensure_retention():
+    """
+    Turn each tier's `timestamp` index into a TTL index for its retention.
+    Applied only after the rollups have caught up, so raw history is never
+    expired before it has been aggregated.
+    """
+    for tier in TIERS:
+        if tier.retention_days is not None:
+            await _ensure_ttl_index(tier)
+
+
+async def _ensure_ttl_index(tier):
+    options = {"expireAfterSeconds": tier.retention_days * 24 * 3600}
+
+    try:
+        await tier.collection.create_index([("timestamp", ASCENDING)], **options)
+    except OperationFailure as e:
+        # An existing plain timestamp index (or a different TTL) can't be
+        # recreated with new options; change the TTL in place instead.
+        if e.code not in (85, 86):
+            raise
+        await db.command(
+            "collMod",
+            tier.collection.name,
+            index={"keyPattern": {"timestamp": 1}, **options},
+        )
+
+
+async def ping():
+    """
+    Round-trip to the server; raises if it is unreachable.
+    """
+    with pymongo.timeout(MONGO_QUERY_TIMEOUT):
+        await db.command("ping")
+
+
+async def latest_server_metrics() -> dict | None:
+    """
+    Newest `server_metrics` sample, or None if nothing has been pushed yet.
+    """
+    with pymongo.timeout(MONGO_QUERY_TIMEOUT):
+        return await server_metrics.find_one(sort=[("timestamp", -1)])
+
+
+async def latest_metrics_timestamp():
+    """
+    Timestamp of the newest `server_metrics` sample, or None.
+    """
+    with pymongo.timeout(MONGO_QUERY_TIMEOUT):
+        doc = await server_metrics.find_one(
+            {}, {"_id": 0, "timestamp": 1}, sort=[("timestamp", -1)]
+        )
+    return doc["timestamp"] if doc else None
+
+
+async def online_players() -> list[dict]:
+    """
+    Player documents currently flagged as online (names only).
+    """
+    with pymongo.timeout(MONGO_QUERY_TIMEOUT):
+        cursor = players.find({"online": True}, {"name": 1})
+        return await cursor.to_list()
+
+
+async def find_player(name: str) -> dict | None:
+    """
+    Case-insensitive exact lookup of a player's stats document.
+
+    Args:
+        name: Minecraft username as typed by the user.
+    """
+    with pymongo.timeout(MONGO_QUERY_TIMEOUT):
+        return await players.find_one({"name": name}, collation=NAME_COLLATION)
+
+
+async def find_duels(name: str) -> dict | None:
+    """
+    Case-insensitive exact lookup of a player's duel record.
+
+    Args:
+        name: Minecraft username as typed by the user.
+    """
+    with pymongo.timeout(MONGO_QUERY_TIMEOUT):
+        return await duels_db.find_one({"name": name}, collation=NAME_COLLATION)
+
+
+async def player_names_seen_since(last_seen_ts: int | None) -> list[dict]:
+    """
+    Names of players seen at or after `last_seen_ts` (all players if None).
+
+    Args:
+        last_seen_ts: Epoch milliseconds watermark from the previous refresh.
+    """
+    query = {} if last_seen_ts is None else {"last_seen_ts": {"$gte": last_seen_ts}}
+    with pymongo.timeout(MONGO_QUERY_TIMEOUT * 4):
+        cursor = players.find(query, {"_id": 0, "name": 1, "last_seen_ts": 1})
+        return await cursor.to_list()
+
+
+async def duel_names_after(last_id) -> list[dict]:
+    """
+    Names from duel records inserted after `last_id` (all records if None).
+
+    Args:
+        last_id: `_id` of the newest record from the previous refresh.
+    """
+    query = {} if last_id is None else {"_id": {"$gt": last_id}}
+    with pymongo.timeout(MONGO_QUERY_TIMEOUT * 4):
+        cursor = duels_db.find(query, {"name": 1}).sort("_id", 1)
+        return await cursor.to_list()
+
+
+async def metric_series(fields: list[str], since) -> list[dict]:
+    """
+    Raw `server_metrics` samples with a value for any of `fields`, oldest
+    first. All fields come back from one projected query.
+
+    Args:
+        fields: Document fields to project.
+        since: Only samples with `timestamp >= since`.
+    """
+    projection = {"_id": 0, "timestamp": 1, **{field: 1 for field in fields}}
+    query = {
+        "timestamp": {"$gte": since},
+        "$or": [{field: {"$ne": None}} for field in fields],
+    }
+    with pymongo.timeout(MONGO_QUERY_TIMEOUT * 4):
+        cursor = server_metrics.find(query, projection).sort("timestamp", 1)
+        return await cursor.to_list()
+
+
+async def metric_buckets(
+    fields: list[str], since, bucket_seconds: int, tier: Tier = RAW_TIER
+) -> list[dict]:
+    """
+    Downsampled metric data: min/avg/max per field per fixed-width time
+    bucket, computed in Mongo so only one row per bucket is shipped.
+
+    Args:
+        fields: Document fields to aggregate.
+        since: Only samples with `timestamp >= since`.
+        bucket_seconds: Width of each bucket.
+        tier: Resolution tier to read from.
+
+    Returns:
+        list[dict]: Rows with `timestamp` and `<field>__min`, `<field>__avg`,
+        `<field>__max` for every field, oldest first.
+    """
+    group = {
+        "_id": {
+            "$dateTrunc": {
+                "date": "$timestamp",
+                "unit": "second",
+                "binSize": bucket_seconds,
+            }
+        },
+    }
+    present = []
+    # Rollup buckets hold different sample counts, so their averages are
+    # weighted by `count` and divided out after grouping.
+    weighted, helpers = {}, []
+    for field in fields:
+        if tier.rolled_up:
+            present.append({f"{field}.avg": {"$ne": None}})
+            group[f"{field}__min"] = {"$min": f"${field}.min"}
+            group[f"{field}__sum"] = {"$sum": {"$multiply": [f"${field}.avg", "$count"]}}
+            group[f"{field}__n"] = {
+                "$sum": {"$cond": [{"$isNumber": f"${field}.avg"}, "$count", 0]}
+            }
+            group[f"{field}__max"] = {"$max": f"${field}.max"}
+            weighted[f"{field}__avg"] = {
+                "$cond": [
+                    {"$gt": [f"${field}__n", 0]},
+                    {"$divide": [f"${field}__sum", f"${field}__n"]},
+                    None,
+                ]
+            }
+            helpers += [f"{field}__sum", f"{field}__n"]
+        else:
+            present.append({field: {"$ne": None}})
+            group[f"{field}__min"] = {"$min": f"${field}"}
+            group[f"{field}__avg"] = {"$avg": f"${field}"}
+            group[f"{field}__max"] = {"$max": f"${field}"}
+
+    pipeline = [
+        {"$match": {"timestamp": {"$gte": since}, "$or": present}},
+        {"$group": group},
+        {"$sort": {"_id": 1}},
+        {"$set": {"timestamp": "$_id", **weighted}},
+        {"$unset": ["_id", *helpers]},
+    ]
+    with pymongo.timeout(MONGO_QUERY_TIMEOUT * 4):
+        cursor = await tier.collection.aggregate(pipeline)
+        return await cursor.to_list()
+
+
+async def tier_timestamp(tier: Tier, newest: bool = True):
+    """
+    Timestamp of the newest (or oldest) document in `tier`, or None if empty.
+    """
+    with pymongo.timeout(MONGO_QUERY_TIMEOUT):
+        doc = await tier.collection.find_one(
+            {}, {"timestamp": 1}, sort=[("timestamp", -1 if newest else 1)]
+        )
+    return doc["timestamp"] if doc else None
+
+
+async def roll_up(source: Tier, target: Tier, fields: list[str], since, until):
+    """
+    Aggregate `source` samples in `[since, until)` into `target` buckets with
+    min/max/avg/last per field. Buckets are upserted by start time, so
+    re-running over an overlapping range is harmless.
+
+    Args:
+        source: Tier to read (raw or a finer rollup).
+        target: Rolled-up tier to write.
+        fields: Metric fields to aggregate.
+        since: Inclusive lower bound, or None for everything.
+        until: Exclusive upper bound; should be a bucket boundary.
+    """
+    match = {"$lt": until}
+    if since is not None:
+        match["$gte"] = since
+
+    group = {
+        "_id": {
+            "$dateTrunc": {"date": "$timestamp", "unit": "second", "binSize": target.seconds}
+        },
+    }
+    project = {"_id": 1, "timestamp": "$_id"}
+
+    if source.rolled_up:
+        group["count"] = {"$sum": "$count"}
+        project["count"] = 1
+        for field in fields:
+            weight = {"$cond": [{"$isNumber": f"${field}.avg"}, "$count", 0]}
+            group[f"{field}__min"] = {"$min": f"${field}.min"}
+            group[f"{field}__max"] = {"$max": f"${field}.max"}
+            group[f"{field}__sum"] = {"$sum": {"$multiply": [f"${field}.avg", "$count"]}}
+            group[f"{field}__n"] = {"$sum": weight}
+            group[f"{field}__last"] = {"$last": f"${field}.last"}
+            project[field] = {
+                "min": f"${field}__min",
+                "max": f"${field}__max",
+                "avg": {
+                    "$cond": [
+                        {"$gt": [f"${field}__n", 0]},
+                        {"$divide": [f"${field}__sum", f"${field}__n"]},
+                        None,
+                    ]
+                },
+                "last": f"${field}__last",
+            }
+    else:
+        group["count"] = {"$sum": 1}
+        project["count"] = 1
+        for field in fields:
+            group[f"{field}__min"] = {"$min": f"${field}"}
+            group[f"{field}__max"] = {"$max": f"${field}"}
+            group[f"{field}__avg"] = {"$avg": f"${field}"}
+            group[f"{field}__last"] = {"$last": f"${field}"}
+            project[field] = {
+                "min": f"${field}__min",
+                "max": f"${field}__max",
+                "avg": f"${field}__avg",
+                "last": f"${field}__last",
+            }
+
+    pipeline = [
+        {"$match": {"timestamp": match}},
+        {"$sort": {"timestamp": 1}},
+        {"$group": group},
+        {"$project": project},
+        {
+            "$merge": {
+                "into": target.collection.name,
+                "on": "_id",
+                "whenMatched": "replace",
+                "whenNotMatched": "insert",
+            }
+        },
+    ]
+    with pymongo.timeout(MONGO_QUERY_TIMEOUT * 20):
+        cursor = await source.collection.aggregate(pipeline)
+        await cursor.to_list()
+
+
+async def close():
+    """
+    Close the client and its connection pool on shutdown.
+    """
+    await client.close()
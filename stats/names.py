@@ -0,0 +1,105 @@
+from stats.mongo import player_names_seen_since, duel_names_after
+import bisect
+import time
+
+MAX_SUGGESTIONS = 25  # Discord's autocomplete limit
+# Overlap for the clock-based player watermark, covering skew between the
+# bot and the plugin that writes `last_seen_ts`.
+WATERMARK_SLACK_MS = 60_000
+
+
+class NameIndex:
+    """
+    Sorted, case-insensitive prefix index of player names kept in memory so
+    autocomplete never touches Mongo.
+    """
+
+    def __init__(self):
+        self._keys = []
+        self._display = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, name):
+        """
+        Insert a name, keeping the latest spelling for an existing key.
+
+        Args:
+            name: Player name as stored in Mongo.
+        """
+        if not isinstance(name, str) or not name:
+            return
+        key = name.lower()
+        if key not in self._display:
+            bisect.insort(self._keys, key)
+        self._display[key] = name
+
+    def add_many(self, names):
+        """
+        Bulk insert; re-sorts once instead of inserting one by one.
+
+        Args:
+            names: Iterable of player names.
+        """
+        for name in names:
+            if isinstance(name, str) and name:
+                self._display[name.lower()] = name
+        self._keys = sorted(self._display)
+
+    def suggest(self, prefix, limit=MAX_SUGGESTIONS):
+        """
+        Names starting with `prefix` (case-insensitive), alphabetically.
+
+        Args:
+            prefix: What the user has typed so far.
+            limit: Maximum suggestions to return.
+        """
+        prefix = prefix.lower()
+        start = bisect.bisect_left(self._keys, prefix)
+        out = []
+        for key in self._keys[start : start + limit]:
+            if not key.startswith(prefix):
+                break
+            out.append(self._display[key])
+        return out
+
+
+player_names = NameIndex()
+duel_names = NameIndex()
+
+_players_watermark = None
+_duels_watermark = None
+
+
+async def refresh_name_indexes():
+    """
+    Pull names added since the previous refresh into both indexes. The first
+    call loads everything; later calls only fetch players whose
+    `last_seen_ts` moved and duel records inserted since the last `_id`.
+    """
+    global _players_watermark, _duels_watermark
+
+    started_ms = int(time.time() * 1000)
+    docs = await player_names_seen_since(_players_watermark)
+    if _players_watermark is None:
+        player_names.add_many(doc.get("name") for doc in docs)
+    else:
+        for doc in docs:
+            player_names.add(doc.get("name"))
+    seen = [doc["last_seen_ts"] for doc in docs if isinstance(doc.get("last_seen_ts"), int)]
+    if seen:
+        _players_watermark = max(seen + [_players_watermark or 0])
+    elif _players_watermark is None:
+        # No player has an integer `last_seen_ts` yet; without a watermark
+        # every refresh would reload the whole collection.
+        _players_watermark = started_ms - WATERMARK_SLACK_MS
+
+    docs = await duel_names_after(_duels_watermark)
+    if _duels_watermark is None:
+        duel_names.add_many(doc.get("name") for doc in docs)
+    else:
+        for doc in docs:
+            duel_names.add(doc.get("name"))
+    if docs:
+        _duels_watermark = docs[-1]["_id"]
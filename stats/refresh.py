@@ -0,0 +1,113 @@
+from stats.graphs import DEFAULT_PUSH_INTERVAL_SECONDS
+from stats.mongo import latest_metrics_timestamp
+from utils import ping_stats, SingleFlightCache
+from datetime import datetime
+import asyncio
+import time
+
+# A stored sample younger than this is served as-is, no ping needed.
+FRESH_SAMPLE_SECONDS = DEFAULT_PUSH_INTERVAL_SECONDS
+# Callers within this window share the previous refresh result.
+REFRESH_DEBOUNCE_SECONDS = 3
+# Per-player refreshes arriving within this window go out as one request.
+PLAYER_BATCH_WINDOW_SECONDS = 0.05
+
+
+async def _refresh_if_stale():
+    latest = await latest_metrics_timestamp()
+    if latest is not None:
+        age = (datetime.utcnow() - latest).total_seconds()
+        if age < FRESH_SAMPLE_SECONDS:
+            return True
+    return await ping_stats()
+
+
+_server_refresh = SingleFlightCache(REFRESH_DEBOUNCE_SECONDS)
+
+
+async def refresh_stats():
+    """
+    Make sure `server_metrics` is recent before a command reads it. Skips
+    the ping while the newest sample is younger than the push interval, and
+    concurrent callers share one in-flight ping, so load on the game server
+    doesn't grow with the number of Discord users.
+
+    Returns:
+        bool: Whether stored data is fresh or a refresh was acknowledged.
+    """
+    return await _server_refresh.get(_refresh_if_stale)
+
+
+class PlayerRefreshBatcher:
+    """
+    Collects per-player refresh requests for a short window and sends them
+    as one `ping_stats` call. Requests for a player already queued, in
+    flight or refreshed within the debounce window share that result.
+    """
+
+    def __init__(self, window=PLAYER_BATCH_WINDOW_SECONDS, debounce=REFRESH_DEBOUNCE_SECONDS):
+        self.window = window
+        self.debounce = debounce
+        self._pending = {}
+        self._inflight = {}
+        self._done_at = {}
+        self._flush_task = None
+
+    async def refresh(self, uuid):
+        """
+        Refresh one player's stats, batched with other concurrent requests.
+
+        Args:
+            uuid: Player UUID as stored in Mongo.
+
+        Returns:
+            bool: Whether the server acknowledged the refresh.
+        """
+        if time.monotonic() - self._done_at.get(uuid, float("-inf")) < self.debounce:
+            return True
+
+        future = self._pending.get(uuid) or self._inflight.get(uuid)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[uuid] = future
+            if self._flush_task is None:
+                self._flush_task = asyncio.create_task(self._flush())
+
+        return await asyncio.shield(future)
+
+    async def _flush(self):
+        await asyncio.sleep(self.window)
+        batch, self._pending = self._pending, {}
+        self._flush_task = None
+        self._inflight.update(batch)
+
+        try:
+            ok = await ping_stats(list(batch))
+        except Exception:
+            ok = False
+        finally:
+            for uuid in batch:
+                self._inflight.pop(uuid, None)
+
+        now = time.monotonic()
+        for uuid, future in batch.items():
+            if ok:
+                self._done_at[uuid] = now
+            if not future.done():
+                future.set_result(ok)
+
+        for uuid in [u for u, at in self._done_at.items() if now - at >= self.debounce]:
+            del self._done_at[uuid]
+
+
+_player_refresh = PlayerRefreshBatcher()
+
+
+async def refresh_player(uuid):
+    """
+    Batched, debounced refresh of one player's stats.
+
+    Args:
+        uuid: Player UUID as stored in Mongo.
+    """
+    return await _player_refresh.refresh(uuid)
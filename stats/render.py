@@ -0,0 +1,170 @@
+"""
+Matplotlib drawing for `/graph`. Kept apart from `stats.graphs` so render
+workers import only this module, NumPy and matplotlib, never the bot.
+"""
+import io
+import numpy as np
+
+DARK_BG = "#0B0B0C"
+AX_BG = "#111113"
+GRID_COLOR = "#26262A"
+LINE_COLOR = "#ff8524"
+# Extra line colours for overlaid metrics, in plot order after LINE_COLOR.
+OVERLAY_COLORS = ["#4FC3F7", "#9CCC65", "#CE93D8"]
+FILL_COLOR = "#E97112"
+TEXT_COLOR = "#E6E6E6"
+
+
+def metric_label(metric: str) -> str:
+    return metric.replace("_", " ").title()
+
+
+def axis_unit(ylabel):
+    """
+    Unit suffix of an axis label, e.g. "(%)" for "System CPU (%)".
+    """
+    if ylabel and ylabel.endswith(")") and "(" in ylabel:
+        return ylabel[ylabel.rindex("(") :]
+    return None
+
+
+def _style_axes(ax, ylabel):
+    ax.set_facecolor(AX_BG)
+
+    ax.grid(
+        True,
+        linestyle="--",
+        linewidth=0.6,
+        color=GRID_COLOR,
+        alpha=0.45,
+    )
+
+    ax.set_ylabel(ylabel, color=TEXT_COLOR, labelpad=8)
+
+    ax.tick_params(
+        colors=TEXT_COLOR,
+        labelsize=9,
+        length=0,
+    )
+
+    for spine in ax.spines.values():
+        spine.set_color(GRID_COLOR)
+        spine.set_linewidth(1.0)
+
+
+def _draw_filled(ax, times, values, band):
+    ax.plot(
+        times,
+        values,
+        color=LINE_COLOR,
+        linewidth=2.8,
+        solid_capstyle="round",
+        zorder=3,
+    )
+
+    ax.fill_between(
+        times,
+        values,
+        0,
+        where=~np.isnan(values),
+        color=FILL_COLOR,
+        alpha=0.90,
+        interpolate=False,
+        zorder=2,
+    )
+
+    if band:
+        lows, highs = band
+        ax.fill_between(
+            times,
+            lows,
+            highs,
+            color=LINE_COLOR,
+            alpha=0.35,
+            linewidth=0,
+            zorder=2.5,
+        )
+
+    ax.plot(
+        times,
+        values,
+        color="#FF8C2A",
+        linewidth=5.0,
+        zorder=1,
+    )
+
+
+def _draw_overlay(ax, times, series):
+    for item, color in zip(series, [LINE_COLOR] + OVERLAY_COLORS):
+        ax.plot(
+            times,
+            item["values"],
+            color=color,
+            linewidth=2.4,
+            solid_capstyle="round",
+            label=metric_label(item["metric"]),
+            zorder=3,
+        )
+        if item["band"]:
+            lows, highs = item["band"]
+            ax.fill_between(times, lows, highs, color=color, alpha=0.25, linewidth=0, zorder=2)
+
+    legend = ax.legend(loc="upper left", fontsize=9, frameon=False)
+    for text in legend.get_texts():
+        text.set_color(TEXT_COLOR)
+
+
+def render_png(times, series, minutes, overlay):
+    """
+    Draw the series and return it as PNG bytes. Runs in a render worker.
+
+    Args:
+        times: Shared datetime64 time axis.
+        series: Dicts with `metric`, `ylabel`, `values` and an optional
+            (lows, highs) `band` envelope.
+        minutes: Window length, for the title.
+        overlay: Draw all series on one axis instead of stacking them.
+    """
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    rows = 1 if overlay else len(series)
+    height = 4.5 if rows == 1 else 1.2 + 2.6 * rows
+    fig, axes = plt.subplots(rows, 1, sharex=True, figsize=(9, height), squeeze=False)
+    axes = axes[:, 0]
+    fig.patch.set_facecolor(DARK_BG)
+
+    if overlay:
+        _style_axes(axes[0], axis_unit(series[0]["ylabel"])[1:-1])
+        _draw_overlay(axes[0], times, series)
+    else:
+        for ax, item in zip(axes, series):
+            _style_axes(ax, item["ylabel"])
+            _draw_filled(ax, times, item["values"], item["band"])
+
+    axes[-1].set_xlabel("Time", color=TEXT_COLOR, labelpad=8)
+
+    axes[0].set_title(
+        f"{' vs '.join(metric_label(item['metric']) for item in series)} · last {minutes} min",
+        color=TEXT_COLOR,
+        fontsize=12,
+        pad=12,
+        loc="left",
+        fontweight="bold",
+    )
+
+    plt.tight_layout()
+
+    buf = io.BytesIO()
+    plt.savefig(
+        buf,
+        format="png",
+        dpi=140,
+        facecolor=fig.get_facecolor(),
+        bbox_inches="tight",
+    )
+    plt.close(fig)
+
+    return buf.getvalue()
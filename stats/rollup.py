@@ -0,0 +1,58 @@
+from stats.graphs import METRICS
+from stats.mongo import RAW_TIER, MINUTE_TIER, HOUR_TIER, roll_up, tier_timestamp, ensure_retention
+from datetime import datetime, timedelta
+
+ROLLUP_FIELDS = sorted({field for field, _, _, _ in METRICS.values()})
+
+# Backfills are split so a single aggregation never scans months of raw data.
+BACKFILL_CHUNK = timedelta(days=1)
+
+_watermarks = {}
+_retention_applied = False
+
+
+def _floor(ts, seconds):
+    epoch = datetime(1970, 1, 1)
+    return ts - timedelta(seconds=(ts - epoch).total_seconds() % seconds)
+
+
+async def _roll_tier(source, target, now):
+    until = _floor(now, target.seconds)
+    since = _watermarks.get(target.collection.name)
+
+    if since is None:
+        # First pass after startup: resume from the newest stored bucket
+        # (it may be partial), or backfill from the oldest source sample.
+        since = await tier_timestamp(target)
+        if since is None:
+            oldest = await tier_timestamp(source, newest=False)
+            if oldest is None:
+                return
+            since = _floor(oldest, target.seconds)
+    else:
+        # Re-roll the previous bucket to pick up late samples.
+        since = since - timedelta(seconds=target.seconds)
+
+    while since < until:
+        chunk_until = min(since + BACKFILL_CHUNK, until)
+        await roll_up(source, target, ROLLUP_FIELDS, since, chunk_until)
+        since = chunk_until
+
+    _watermarks[target.collection.name] = until
+
+
+async def run_rollups():
+    """
+    Bring the 1-minute and 1-hour tiers up to date, then (once) enable TTL
+    retention on the tiers so raw samples are only expired after they have
+    been rolled up.
+    """
+    global _retention_applied
+
+    now = datetime.utcnow()
+    await _roll_tier(RAW_TIER, MINUTE_TIER, now)
+    await _roll_tier(MINUTE_TIER, HOUR_TIER, now)
+
+    if not _retention_applied:
+        await ensure_retention()
+        _retention_applied = True
@@ -0,0 +1,244 @@
+import math
+import time
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+
+_registry = []
+# backend -> {"ok": unix time, "error": unix time} of the latest outcomes.
+_backend_outcomes = {}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._values = {}
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self._values.items()):
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value):
+        return [f"{self.name}{_label_str(self.labels, key)} {_number(value)}"]
+
+
+class Counter(_Metric):
+    """
+    STACK: Telemetry
+    Monotonic count, e.g. errors per backend call.
+    """
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """
+    STACK: Telemetry
+    Value that can go up and down, e.g. the latest event loop lag.
+    """
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """
+    STACK: Telemetry
+    Cumulative-bucket latency histogram in Prometheus' format.
+
+    Args:
+        buckets: Upper bounds in seconds; `+Inf` is added automatically.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, description, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(buckets) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+        counts = state[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        state[1] += value
+        state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observe how long the `with` block takes, including awaits inside it.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_value(self, key, state):
+        counts, total, count = state
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets, counts):
+            cumulative += n
+            labels = _label_str(self.labels, key, [("le", _number(bound))])
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _label_str(self.labels, key)
+        lines.append(f"{self.name}_sum{labels} {_number(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+command_duration = Histogram(
+    "mcbot_command_duration_seconds",
+    "Slash command handling time, from receipt to handler return.",
+    ("command", "status"),
+)
+backend_duration = Histogram(
+    "mcbot_backend_call_duration_seconds",
+    "Latency of calls to external backends.",
+    ("backend", "call"),
+)
+backend_errors = Counter(
+    "mcbot_backend_errors_total",
+    "Failed or timed out calls to external backends.",
+    ("backend", "call"),
+)
+poll_duration = Histogram(
+    "mcbot_poll_duration_seconds",
+    "Time spent in one run of a background loop.",
+    ("loop",),
+)
+render_duration = Histogram(
+    "mcbot_graph_render_seconds",
+    "Time spent drawing a graph in the render pool (cache misses only).",
+)
+loop_lag = Histogram(
+    "mcbot_event_loop_lag_seconds",
+    "How late the event loop ran the watchdog heartbeat.",
+    buckets=LAG_BUCKETS,
+)
+loop_lag_last = Gauge(
+    "mcbot_event_loop_lag_last_seconds",
+    "Most recent event loop lag sample.",
+)
+loop_stalls = Counter(
+    "mcbot_event_loop_stalls_total",
+    "Times a callback blocked the event loop past the stall threshold.",
+    ("site",),
+)
+loop_stall_duration = Histogram(
+    "mcbot_event_loop_stall_seconds",
+    "How long each detected event loop stall lasted.",
+    buckets=LAG_BUCKETS,
+)
+startup_phase = Gauge(
+    "mcbot_startup_phase_seconds",
+    "Duration of each startup phase (import groups, setup_hook) at the last boot.",
+    ("phase",),
+)
+startup_ready = Gauge(
+    "mcbot_startup_ready_seconds",
+    "Seconds from process start to the first on_ready at the last boot.",
+)
+
+
+def observe_call(backend, call, seconds, ok):
+    """
+    STACK: Telemetry
+    Record one backend call's latency and outcome.
+
+    Args:
+        backend: `gce`, `mongo`, `mcstatus`, `crafty`, `stats`, ...
+        call: Operation name within that backend.
+        seconds: How long the call took.
+        ok: Whether it succeeded.
+    """
+    backend_duration.observe(seconds, backend=backend, call=call)
+    if not ok:
+        backend_errors.inc(backend=backend, call=call)
+    _backend_outcomes.setdefault(backend, {})["ok" if ok else "error"] = time.time()
+
+
+def backend_status(backend):
+    """
+    STACK: Telemetry
+    Outcome of the latest calls to `backend`, without making a new one.
+
+    Returns:
+        dict: `reachable` (None if never called) and the age in seconds of
+        the last success and last error.
+    """
+    outcomes = _backend_outcomes.get(backend, {})
+    now = time.time()
+    ok, error = outcomes.get("ok"), outcomes.get("error")
+    return {
+        "reachable": None if ok is None and error is None else (error is None or (ok or 0) > error),
+        "last_ok_age": None if ok is None else round(now - ok, 1),
+        "last_error_age": None if error is None else round(now - error, 1),
+    }
+
+
+@contextmanager
+def track(backend, call):
+    """
+    STACK: Telemetry
+    Time a backend call and count it as an error if the block raises.
+    """
+    start = time.perf_counter()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        observe_call(backend, call, time.perf_counter() - start, ok)
+
+
+def render():
+    """
+    STACK: Telemetry
+    All registered metrics in the Prometheus text exposition format.
+    """
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,151 @@
+import json
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Finished traces kept in memory for `/traces` summaries.
+TRACE_WINDOW = 2000
+PERCENTILES = (50, 95, 99)
+# TRACE_LOG=0 keeps the window but skips the per-command log line.
+LOG_TRACES = os.getenv("TRACE_LOG", "1") != "0"
+
+_current = ContextVar("trace", default=None)
+_window = deque(maxlen=TRACE_WINDOW)
+
+
+class Trace:
+    """
+    STACK: Telemetry
+    Timeline of one slash command invocation. Spans are `(phase, seconds)`
+    pairs; a phase may appear more than once (e.g. several Mongo queries).
+
+    Args:
+        command: Qualified command name.
+        receipt: Seconds between Discord creating the interaction and the
+            bot receiving it.
+    """
+
+    def __init__(self, command, receipt=None):
+        self.command = command
+        self.started = time.perf_counter()
+        self.spans = []
+        if receipt is not None:
+            self.spans.append(("receipt", max(0.0, receipt)))
+
+    def add(self, phase, seconds):
+        self.spans.append((phase, seconds))
+
+
+def start(command, receipt=None):
+    """
+    STACK: Telemetry
+    Begin a trace and make it current for the rest of this task (and any
+    tasks it spawns).
+
+    Returns:
+        Trace
+    """
+    trace = Trace(command, receipt)
+    _current.set(trace)
+    return trace
+
+
+def record(phase, seconds):
+    """
+    STACK: Telemetry
+    Add a span measured elsewhere (e.g. by a driver callback) to the current
+    trace, if there is one.
+    """
+    trace = _current.get()
+    if trace is not None:
+        trace.add(phase, seconds)
+
+
+@contextmanager
+def span(phase):
+    """
+    STACK: Telemetry
+    Time the `with` block as `phase` of the current trace. A no-op outside
+    a traced command (background loops, autocomplete).
+    """
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(phase, time.perf_counter() - start_time)
+
+
+async def traced(phase, aw):
+    """
+    STACK: Telemetry
+    Await `aw` inside `span(phase)`; keeps call sites to a single line.
+    """
+    with span(phase):
+        return await aw
+
+
+def finish(trace, status):
+    """
+    STACK: Telemetry
+    Close `trace`, log it as one JSON line and add it to the rolling window.
+
+    Args:
+        trace: Trace returned by `start()`.
+        status: `ok` or `error`.
+    """
+    total = time.perf_counter() - trace.started
+    entry = {
+        "command": trace.command,
+        "status": status,
+        "total_ms": round(total * 1000, 1),
+        "spans": [[phase, round(seconds * 1000, 1)] for phase, seconds in trace.spans],
+    }
+    if LOG_TRACES:
+        print(f"[TRACE] {json.dumps(entry)}")
+    _window.append((trace.command, total, trace.spans))
+
+
+def _percentile(sorted_values, pct):
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize():
+    """
+    STACK: Telemetry
+    Percentiles over the rolling window, per command and per phase. Repeated
+    phases within one trace are summed first, so "mongo" means total Mongo
+    time for that invocation.
+
+    Returns:
+        dict: `{command: {phase: {"count": n, "p50": s, "p95": s, "p99": s}}}`
+        with the end-to-end time under the `total` phase.
+    """
+    samples = {}
+    for command, total, spans in _window:
+        phases = samples.setdefault(command, {})
+        phases.setdefault("total", []).append(total)
+
+        per_trace = {}
+        for phase, seconds in spans:
+            per_trace[phase] = per_trace.get(phase, 0.0) + seconds
+        for phase, seconds in per_trace.items():
+            phases.setdefault(phase, []).append(seconds)
+
+    summary = {}
+    for command, phases in samples.items():
+        summary[command] = {}
+        for phase, values in phases.items():
+            values.sort()
+            summary[command][phase] = {
+                "count": len(values),
+                **{f"p{pct}": _percentile(values, pct) for pct in PERCENTILES},
+            }
+    return summary
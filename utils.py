@@ -2,16 +2,19 @@ from dotenv import load_dotenv
 import yaml
 import discord
 
-from mcstatus import JavaServer
 import asyncio
+import functools
+import ipaddress
 import os
+import time
 
-from google.cloud import compute_v1
-from google.oauth2 import service_account
 import json
 import base64
 import aiohttp
 
+import telemetry
+import tracing
+
 load_dotenv()
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CONFIG_PATH = os.path.join(BASE_DIR, "config.yaml")
@@ -20,6 +23,8 @@ with open(CONFIG_PATH, "r") as f:
     config = yaml.safe_load(f)
 
 ADMIN_ID = config["bot"]["ADMIN_ID"].split(",")
+GUILD_ID = config["bot"].get("GUILD_ID")
+COMMAND_HASH_PATH = os.path.join(BASE_DIR, ".command_tree_hash")
 
 SERVER_IP = config["crafty"]["SERVER_IP"]
 SERVER_ID = config["crafty"]["SERVER_ID"]
@@ -27,14 +32,144 @@ SERVER_ID = config["crafty"]["SERVER_ID"]
 PROJECT_ID = config["gcp"]["PROJECT_ID"]
 ZONE = config["gcp"]["ZONE"]
 INSTANCE_NAME = config["gcp"]["INSTANCE_NAME"]
+GCE_API_TIMEOUT = config["gcp"].get("API_TIMEOUT", 30)
+VM_OPERATION_TIMEOUT = config["gcp"].get("OPERATION_TIMEOUT", 300)
+VM_OPERATION_POLL_SECONDS = 3
+VM_STATUS_CACHE_TTL = config["gcp"].get("STATUS_CACHE_TTL", 5)
+
+MC_DEFAULT_PORT = 25565
+MC_STATUS_TIMEOUT = 2
+MC_DNS_MIN_TTL = 30
+MC_DNS_MAX_TTL = 3600
+PLAYER_COUNT_STALE_SECONDS = 60
+
+# /stats-style commands wait this long for a refresh ping before answering
+# with whatever is already stored, and give every lookup this overall budget.
+STATS_REFRESH_BUDGET = 1.5
+STATS_DEADLINE = 4
+
+HTTP_TIMEOUT = aiohttp.ClientTimeout(total=10, connect=3)
+STATS_PING_TIMEOUT = aiohttp.ClientTimeout(total=2)
 
 GOOGLE_SERVICE_ACCOUNT_BASE64 = os.getenv("GOOGLE_SERVICE_ACCOUNT_BASE64")
 CRAFTY_TOKEN = os.getenv("CRAFTY_TOKEN")
 
 
-key_json = json.loads(base64.b64decode(GOOGLE_SERVICE_ACCOUNT_BASE64))
-credentials = service_account.Credentials.from_service_account_info(key_json)
-instances_client = compute_v1.InstancesClient(credentials=credentials)
+@functools.cache
+def _get_instances_client():
+    """
+    STACK: VM control
+    Build the compute client on first use. google-cloud-compute is slow to
+    import, so this runs inside the first GCE worker thread instead of at
+    bot startup.
+    """
+    from google.cloud import compute_v1
+    from google.oauth2 import service_account
+
+    key_json = json.loads(base64.b64decode(GOOGLE_SERVICE_ACCOUNT_BASE64))
+    credentials = service_account.Credentials.from_service_account_info(key_json)
+    return compute_v1.InstancesClient(credentials=credentials)
+
+
+def _instances_call(method, **kwargs):
+    return getattr(_get_instances_client(), method)(**kwargs)
+
+
+class SingleFlightCache:
+    """
+    STACK: Caching
+    Holds one value for `ttl` seconds. Concurrent misses share a single
+    in-flight fetch instead of each starting their own.
+
+    Args:
+        ttl: Seconds a fetched value stays fresh.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._value = None
+        self._fetched_at = None
+        self._inflight = None
+        self._generation = 0
+
+    async def get(self, fetch):
+        """
+        Return the cached value, or await `fetch()` (shared by all callers) on a miss.
+
+        Args:
+            fetch: Coroutine function producing a fresh value.
+        """
+        if self._fetched_at is not None and time.monotonic() - self._fetched_at < self.ttl:
+            return self._value
+
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._refresh(fetch, self._generation))
+
+        # Shielded so one caller timing out or being cancelled doesn't fail the rest.
+        return await asyncio.shield(self._inflight)
+
+    async def _refresh(self, fetch, generation):
+        try:
+            value = await fetch()
+        finally:
+            if generation == self._generation:
+                self._inflight = None
+
+        # A fetch that started before `invalidate()` must not repopulate the cache.
+        if generation == self._generation:
+            self._value = value
+            self._fetched_at = time.monotonic()
+        return value
+
+    def invalidate(self):
+        """
+        Drop the cached value; the next `get()` fetches fresh data.
+        """
+        self._generation += 1
+        self._value = None
+        self._fetched_at = None
+        self._inflight = None
+
+
+_vm_status_cache = SingleFlightCache(VM_STATUS_CACHE_TTL)
+_http_session = None
+_mc_server = None
+_mc_server_expires = 0.0
+_last_player_count = None
+_last_player_count_at = float("-inf")
+
+
+async def open_http_session():
+    """
+    STACK: HTTP
+    Create the shared `aiohttp` session used for every outbound request.
+    Called once from the bot's `setup_hook`; keeps connections alive between
+    calls and caches DNS so stats pings skip the TCP/TLS handshake.
+
+    Returns:
+        aiohttp.ClientSession
+    """
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=20,
+            limit_per_host=4,
+            ttl_dns_cache=300,
+            keepalive_timeout=60,
+        )
+        _http_session = aiohttp.ClientSession(connector=connector, timeout=HTTP_TIMEOUT)
+    return _http_session
+
+
+async def close_http_session():
+    """
+    STACK: HTTP
+    Close the shared session and its pooled connections on shutdown.
+    """
+    global _http_session
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+    _http_session = None
 
 
 def is_admin(interaction: discord.Interaction):
@@ -52,28 +187,154 @@ def is_admin(interaction: discord.Interaction):
     return False
 
 
-async def get_player_count():
+async def with_deadline(aw, timeout, default=None, shield=False):
+    """
+    STACK: Async helpers
+    Await `aw` for at most `timeout` seconds, returning `default` if it
+    takes longer.
+
+    Args:
+        aw: Coroutine or task to await.
+        timeout: Seconds to wait.
+        default: Value returned on timeout.
+        shield: Let `aw` keep running in the background after the timeout
+            (e.g. a refresh ping whose effect is still useful later).
+    """
+    task = asyncio.ensure_future(aw)
+    try:
+        return await asyncio.wait_for(asyncio.shield(task) if shield else task, timeout)
+    except TimeoutError:
+        if shield:
+            # Nobody awaits the task past this point; retrieve its outcome.
+            task.add_done_callback(_log_background_failure)
+        return default
+    except asyncio.CancelledError:
+        if shield:
+            task.add_done_callback(_log_background_failure)
+        raise
+
+
+def _log_background_failure(task):
+    if not task.cancelled() and task.exception() is not None:
+        print(f"[ASYNC] Background task failed after its deadline: {task.exception()!r}")
+
+
+async def _resolve_mc_server():
     """
     STACK: Server control
-    Run blocking mcstatus code in a background thread.
+    Resolve `SERVER_IP` (SRV record, then A record) once and reuse the
+    result until its DNS TTL runs out, instead of redoing the lookup on
+    every poll.
 
     Returns:
-        status.players.online: Number of online players.
+        JavaServer pointed at the resolved address.
     """
+    global _mc_server, _mc_server_expires
+
+    if _mc_server is not None and time.monotonic() < _mc_server_expires:
+        return _mc_server
+
+    import dns.asyncresolver
+    import dns.exception
+    import dns.resolver
+    from mcstatus import JavaServer
+
+    host, port, ttl = SERVER_IP, MC_DEFAULT_PORT, MC_DNS_MAX_TTL
     try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        try:
+            answer = await dns.asyncresolver.resolve(
+                f"_minecraft._tcp.{host}", "SRV", lifetime=MC_STATUS_TIMEOUT
+            )
+            record = answer[0]
+            host, port = str(record.target).rstrip("."), record.port
+            ttl = min(ttl, answer.rrset.ttl)
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+            pass
+
+        try:
+            answer = await dns.asyncresolver.resolve(host, "A", lifetime=MC_STATUS_TIMEOUT)
+            host = answer[0].address
+            ttl = min(ttl, answer.rrset.ttl)
+        except dns.exception.DNSException:
+            # Names only the OS resolver knows (e.g. /etc/hosts): let the
+            # socket connect resolve it, and retry DNS again soon.
+            ttl = MC_DNS_MIN_TTL
+
+    _mc_server = JavaServer(host, port, timeout=MC_STATUS_TIMEOUT)
+    _mc_server_expires = time.monotonic() + max(ttl, MC_DNS_MIN_TTL)
+    return _mc_server
 
-        def query():
-            server = JavaServer.lookup(SERVER_IP)
-            status = server.status()
-            return status.players.online
 
-        return await asyncio.to_thread(query)
-    except TimeoutError:
-        pass
+async def get_player_count():
+    """
+    STACK: Server control
+    Query the server's player count with mcstatus' async API. If the query
+    fails, the last count seen within `PLAYER_COUNT_STALE_SECONDS` is
+    returned instead.
+
+    Returns:
+        status.players.online: Number of online players, or None if unknown.
+    """
+    global _mc_server, _last_player_count, _last_player_count_at
+
+    try:
+        with telemetry.track("mcstatus", "status"), tracing.span("mcstatus"):
+            server = await _resolve_mc_server()
+            status = await asyncio.wait_for(
+                server.async_status(tries=1), timeout=MC_STATUS_TIMEOUT
+            )
     except Exception as e:
-        print(f"[SERVER CONTROL] Error checking server status: {e}")
+        # The address may have moved (dynamic DNS); resolve again next time.
+        _mc_server = None
+        if not isinstance(e, TimeoutError):
+            print(f"[SERVER CONTROL] Error checking server status: {e}")
+        if time.monotonic() - _last_player_count_at < PLAYER_COUNT_STALE_SECONDS:
+            return _last_player_count
         return None
 
+    _last_player_count = status.players.online
+    _last_player_count_at = time.monotonic()
+    return _last_player_count
+
+
+async def _gce_call(name, method, **kwargs):
+    """
+    STACK: VM control
+    Run a blocking compute client call in a worker thread so the event loop
+    keeps serving the gateway. Bounded by `GCE_API_TIMEOUT`.
+
+    Args:
+        name: Call name for telemetry, e.g. `start` or `operation.done`.
+        method: Blocking callable, e.g. an `InstancesClient` or operation method.
+    """
+    with telemetry.track("gce", name):
+        return await asyncio.wait_for(
+            asyncio.to_thread(method, **kwargs), timeout=GCE_API_TIMEOUT
+        )
+
+
+async def _wait_for_operation(operation, timeout=VM_OPERATION_TIMEOUT):
+    """
+    STACK: VM control
+    Poll a zonal operation until it finishes. Each poll is a short threaded
+    call, so the wait can be cancelled between polls and never pins a thread
+    for the whole VM boot/shutdown.
+
+    Args:
+        operation: `ExtendedOperation` returned by the compute client.
+        timeout: Seconds to wait before giving up.
+    """
+    async with asyncio.timeout(timeout):
+        while not await _gce_call("operation.done", operation.done):
+            await asyncio.sleep(VM_OPERATION_POLL_SECONDS)
+
+    if operation.error_code:
+        raise Exception(
+            f"[VM CONTROL] Operation failed: {operation.error_code} {operation.error_message}"
+        )
+
 
 async def start_vm():
     """
@@ -81,10 +342,19 @@ async def start_vm():
     Starts the virtual machine on Google cloud.
     """
     print(f"[VM CONTROL] Starting {INSTANCE_NAME}")
-    operation = instances_client.start(
-        project=PROJECT_ID, zone=ZONE, instance=INSTANCE_NAME
-    )
-    operation.result()
+    _vm_status_cache.invalidate()
+    try:
+        operation = await _gce_call(
+            "start",
+            functools.partial(_instances_call, "start"),
+            project=PROJECT_ID,
+            zone=ZONE,
+            instance=INSTANCE_NAME,
+            timeout=GCE_API_TIMEOUT,
+        )
+        await _wait_for_operation(operation)
+    finally:
+        _vm_status_cache.invalidate()
     print("[VM CONTROL] VM started")
 
 
@@ -94,24 +364,40 @@ async def stop_vm():
     Stops the virtual machine on Google cloud.
     """
     print(f"[VM CONTROL] Stopping {INSTANCE_NAME}...")
-
-    def send_command():
-        operation = instances_client.stop(
-            project=PROJECT_ID, zone=ZONE, instance=INSTANCE_NAME
+    _vm_status_cache.invalidate()
+    try:
+        operation = await _gce_call(
+            "stop",
+            functools.partial(_instances_call, "stop"),
+            project=PROJECT_ID,
+            zone=ZONE,
+            instance=INSTANCE_NAME,
+            timeout=GCE_API_TIMEOUT,
         )
-        operation.result()
-
-    result = await asyncio.to_thread(send_command)
+        await _wait_for_operation(operation)
+    finally:
+        _vm_status_cache.invalidate()
     print("[VM CONTROL] VM stopped.")
 
 
 async def get_vm_status():
     """
     STACK: VM control
-    Fetches the status of the virtual machine on Google cloud.
+    Fetches the status of the virtual machine on Google cloud. Served from a
+    short-lived cache shared by every command and the idle poller.
     """
-    instance = instances_client.get(
-        project=PROJECT_ID, zone=ZONE, instance=INSTANCE_NAME
+    with tracing.span("vm_status"):
+        return await _vm_status_cache.get(_fetch_vm_status)
+
+
+async def _fetch_vm_status():
+    instance = await _gce_call(
+        "get",
+        functools.partial(_instances_call, "get"),
+        project=PROJECT_ID,
+        zone=ZONE,
+        instance=INSTANCE_NAME,
+        timeout=GCE_API_TIMEOUT,
     )
     return instance.status
 
@@ -123,7 +409,8 @@ async def stop_mc_server():
     """
     headers = {"Authorization": f"{CRAFTY_TOKEN}", "Content-Type": "application/json"}
     url = f"https://pesu-mc.ddns.net:8443/api/v2/servers/{SERVER_ID}/action/stop_server"
-    async with aiohttp.ClientSession() as session:
+    session = await open_http_session()
+    with telemetry.track("crafty", "stop_server"):
         async with session.post(url, headers=headers, ssl=False) as resp:
             text = await resp.text()
             print(f"[SERVER CONTROL] Shutdown Response {resp.status}: {text}")
@@ -167,26 +454,42 @@ def gb(v):
     return f"{v / (1024**3):.2f} GB"
 
 
-async def ping_stats(player_uuid: str | None = None):
+async def ping_stats(player_uuids: list[str] | None = None):
+    """
+    STACK: Stats
+    Ask the game server to push fresh metrics to MongoDB.
+
+    Args:
+        player_uuids: Players whose stats should also be refreshed; sent as
+            repeated `player` query parameters in one request.
+
+    Returns:
+        bool: Whether the server acknowledged the refresh.
+    """
     STATS_TOKEN = os.getenv("STATS_TOKEN")
     STATS_ENDPOINT = "http://" + SERVER_IP + "/mc/stats"
     headers = {"x-stats-token": STATS_TOKEN}
 
-    params = {}
-    if player_uuid:
-        params["player"] = player_uuid
+    params = [("player", uuid) for uuid in player_uuids or ()]
 
+    start = time.perf_counter()
+    ok = False
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                STATS_ENDPOINT,
-                headers=headers,
-                params=params,
-                timeout=aiohttp.ClientTimeout(total=2),
-            ) as resp:
-                await resp.text()
+        session = await open_http_session()
+        async with session.get(
+            STATS_ENDPOINT,
+            headers=headers,
+            params=params,
+            timeout=STATS_PING_TIMEOUT,
+        ) as resp:
+            await resp.text()
+            ok = resp.status == 200
     except (aiohttp.ClientConnectorError, asyncio.TimeoutError):
-        return False
+        pass
     except Exception as e:
         print(f"[STATS] Ping failed: {type(e).__name__}")
-        return False
+    finally:
+        elapsed = time.perf_counter() - start
+        telemetry.observe_call("stats", "ping", elapsed, ok)
+        tracing.record("ping_stats", elapsed)
+    return ok
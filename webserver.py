@@ -1,17 +1,182 @@
-from flask import Flask
-import logging
+from aiohttp import web
+from datetime import datetime, timezone
+from scheduler import AdaptiveLoop
+from stats import ingest, mongo
+import telemetry
+import hmac
+import math
+import os
+import time
 
-app = Flask(__name__)
+WEB_HOST = "0.0.0.0"
+WEB_PORT = int(os.getenv("PORT", "7860"))
+# Plugin batches are small; anything bigger is a misbehaving client.
+MAX_REQUEST_BYTES = 1024 * 1024
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='[%(asctime)s] %(name)s: %(message)s'
-)
+HEALTH_REFRESH_SECONDS = 10
+# The server poller sleeps at most 10 minutes while the VM is off; twice
+# that without a successful run means it is stuck.
+POLL_STALE_SECONDS = 1200
 
-@app.route("/")
-def home():
-    return "[HOST] Bot is online"
+STATS_TOKEN = os.getenv("STATS_TOKEN")
 
-@app.route("/health")
-def health():
-    return {"status": "healthy"}, 200
+_bot = None
+_poller = None
+_runner = None
+_health = {"status": "starting"}
+_ingest_buffer = ingest.IngestBuffer()
+
+
+async def _snapshot_health():
+    """
+    STACK: Web server
+    Rebuild the `/health` snapshot from live state. Runs on a timer so
+    health checks never wait on Discord, Mongo or GCE themselves.
+    """
+    global _health
+
+    latency = _bot.latency if _bot is not None else math.nan
+    ws = getattr(_bot, "ws", None) if _bot is not None else None
+    connected = (
+        _bot is not None
+        and _bot.is_ready()
+        and not _bot.is_closed()
+        and ws is not None
+        and not ws.socket.closed
+    )
+
+    last_poll = _poller.last_success if _poller is not None else None
+    poll_age = None if last_poll is None else round(time.time() - last_poll, 1)
+
+    start = time.perf_counter()
+    try:
+        await mongo.ping()
+        mongo_state = {"reachable": True, "latency_ms": round((time.perf_counter() - start) * 1000, 1)}
+    except Exception as e:
+        mongo_state = {"reachable": False, "error": type(e).__name__}
+
+    gce_state = telemetry.backend_status("gce")
+
+    if not connected or poll_age is None or poll_age > POLL_STALE_SECONDS:
+        status = "unhealthy"
+    elif not mongo_state["reachable"] or gce_state["reachable"] is False:
+        status = "degraded"
+    else:
+        status = "healthy"
+
+    _health = {
+        "status": status,
+        "gateway": {
+            "connected": connected,
+            "latency_ms": round(latency * 1000, 1) if math.isfinite(latency) else None,
+        },
+        "poller": {"last_success_age": poll_age},
+        "mongo": mongo_state,
+        "gce": gce_state,
+        "checked_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+    return HEALTH_REFRESH_SECONDS
+
+
+async def _flush_ingest():
+    await ingest.flush(_ingest_buffer)
+    return ingest.FLUSH_INTERVAL_SECONDS
+
+
+_health_loop = AdaptiveLoop("health_snapshot", _snapshot_health, error_delay=HEALTH_REFRESH_SECONDS)
+_ingest_loop = AdaptiveLoop("ingest_flush", _flush_ingest, error_delay=5)
+
+
+async def home(request):
+    return web.Response(text="[HOST] Bot is online")
+
+
+async def health(request):
+    status = 503 if _health["status"] in ("unhealthy", "starting") else 200
+    return web.json_response(_health, status=status)
+
+
+async def metrics(request):
+    return web.Response(
+        body=telemetry.render().encode(),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
+
+
+async def mc_ingest(request):
+    """
+    STACK: Web server
+    Push endpoint for the server plugin. Body:
+        {"metrics": [{"timestamp": <ms>, ...}], "players": [{"uuid", "set", "inc"}]}
+    Writes are buffered and flushed to Mongo in bulk.
+    """
+    token = request.headers.get("x-stats-token", "")
+    if not STATS_TOKEN or not hmac.compare_digest(token, STATS_TOKEN):
+        return web.json_response({"error": "unauthorized"}, status=401)
+
+    try:
+        payload = await request.json()
+    except ValueError:
+        payload = None
+    if not isinstance(payload, dict):
+        return web.json_response({"error": "expected a JSON object"}, status=400)
+
+    try:
+        metrics = ingest.parse_metrics(payload.get("metrics", []))
+        player_ops = ingest.parse_player_deltas(payload.get("players", []))
+    except ingest.IngestError as e:
+        return web.json_response({"error": str(e)}, status=400)
+
+    if _ingest_buffer.add(metrics, player_ops) >= ingest.FLUSH_BATCH_SIZE:
+        _ingest_loop.wake()
+
+    return web.json_response({"accepted": len(metrics) + len(player_ops)}, status=202)
+
+
+def create_app():
+    app = web.Application(client_max_size=MAX_REQUEST_BYTES)
+    app.router.add_get("/", home)
+    app.router.add_get("/health", health)
+    app.router.add_get("/metrics", metrics)
+    app.router.add_post("/mc/ingest", mc_ingest)
+    return app
+
+
+async def start_webserver(bot, poller):
+    """
+    STACK: Web server
+    Serve `/`, `/health`, `/metrics` and the ingestion route from the bot's
+    own event loop.
+
+    Args:
+        bot: Discord client whose gateway state `/health` reports.
+        poller: Server poll loop whose last successful run `/health` reports.
+    """
+    global _bot, _poller, _runner
+    if _runner is not None:
+        return
+
+    _bot, _poller = bot, poller
+    _runner = web.AppRunner(create_app(), access_log=None)
+    await _runner.setup()
+    await web.TCPSite(_runner, WEB_HOST, WEB_PORT).start()
+    _health_loop.start()
+    _ingest_loop.start()
+    print(f"[WEB] Listening on {WEB_HOST}:{WEB_PORT}")
+
+
+async def stop_webserver():
+    """
+    STACK: Web server
+    Stop serving and write out anything still buffered for ingestion.
+    """
+    global _runner
+    _health_loop.stop()
+    _ingest_loop.stop()
+    if _runner is not None:
+        await _runner.cleanup()
+        _runner = None
+    try:
+        await ingest.flush(_ingest_buffer)
+    except Exception as e:
+        print(f"[WEB] Final ingest flush failed: {e}")